@@ -1,22 +1,43 @@
 #!/usr/bin/env python
 
+import re
 import sys
 import os
+import hashlib
+from io import BytesIO
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
 from gtts import gTTS
 from openai import OpenAI
-from langdetect import detect, DetectorFactory, LangDetectException
+from fast_langdetect import LangDetector, LangDetectConfig, DetectError
 
-# Ensures consistent results for langdetect
-DetectorFactory.seed = 0
+# FastText-based detector: the model is loaded once at import and shared
+# across all detect calls, unlike langdetect which re-scored per call.
+_detector = LangDetector(LangDetectConfig(
+    cache_dir=str(Path.home() / ".steveai" / "fasttext"),
+    allow_fallback=True,
+))
+
+# Sentence terminators used to flush buffered tokens to the TTS workers
+SENTENCE_END_RE = re.compile(r'(?<=[.!?])\s+')
+
+# Content-addressed cache of synthesized MP3 fragments: repeated responses
+# (canned replies, retries) skip the gTTS network round-trip entirely.
+TTS_CACHE_DIR = Path.home() / ".steveai" / "tts_cache"
+TTS_CACHE_MAX_BYTES = 200 * 1024 * 1024  # Keep the cache under ~200 MB
 
 # --- 1. Get User Input and Filename ---
-# Usage: python ai_speak.py "Your question here" [output_filename.mp3]
+# Usage: python ai_speak.py [--no-cache] "Your question here" [output_filename.mp3]
 if len(sys.argv) < 2:
-    print("Usage: python ai_speak.py \"Your question here\" [output_filename.mp3]")
+    print("Usage: python ai_speak.py [--no-cache] \"Your question here\" [output_filename.mp3]")
     sys.exit(1)
 
 # The question is everything after the script name, up to the last argument if it's not the output file
 user_input_args = sys.argv[1:]
+use_cache = True
+if "--no-cache" in user_input_args:
+    use_cache = False
+    user_input_args = [a for a in user_input_args if a != "--no-cache"]
 output_filename = "ai_response.mp3"
 
 # Check if the last argument is a filename (ends in .mp3)
@@ -28,14 +49,78 @@ else:
 
 print(f"User Query: {user_input}")
 
-# --- 2. Call OpenAI API ---
+
+def detect_language(text, default='en'):
+    """Detects the language of the given text, falling back to the default."""
+    # Very short snippets are unreliable to classify; reuse the language of
+    # the user's question instead (cached below at startup).
+    if len(text.strip()) < 20:
+        return default
+    try:
+        lang = _detector.detect(text.replace("\n", " "))["lang"]
+        print(f"Language Detected: {lang}")
+        return lang
+    except DetectError:
+        print(f"Warning: Could not reliably detect language. Defaulting to '{default}'.")
+    except Exception as e:
+        print(f"Warning: Language detection failed with error: {e}. Defaulting to '{default}'.")
+    return default
+
+
+def synthesize_sentence(sentence, lang):
+    """Runs gTTS for one sentence and returns the raw MP3 bytes (worker thread).
+
+    Fragments are cached on disk keyed by sha1(lang|text), so identical
+    sentences are only ever synthesized once.
+    """
+    cache_path = None
+    if use_cache:
+        key = hashlib.sha1(f"{lang}|{sentence}".encode()).hexdigest()
+        cache_path = TTS_CACHE_DIR / f"{key}.mp3"
+        if cache_path.exists():
+            return cache_path.read_bytes()
+
+    buf = BytesIO()
+    gTTS(text=sentence, lang=lang).write_to_fp(buf)
+    data = buf.getvalue()
+
+    if cache_path is not None:
+        try:
+            TTS_CACHE_DIR.mkdir(parents=True, exist_ok=True)
+            cache_path.write_bytes(data)
+        except OSError as e:
+            print(f"Warning: Could not write TTS cache entry: {e}")
+    return data
+
+
+def evict_tts_cache():
+    """Drops the oldest cached fragments until the cache fits the size budget."""
+    try:
+        entries = [(p.stat().st_mtime, p.stat().st_size, p) for p in TTS_CACHE_DIR.glob("*.mp3")]
+    except OSError:
+        return
+    total = sum(size for _, size, _ in entries)
+    for _, size, path in sorted(entries):
+        if total <= TTS_CACHE_MAX_BYTES:
+            break
+        try:
+            path.unlink()
+            total -= size
+        except OSError:
+            pass
+
+
+# --- 2. Call OpenAI API (streaming) ---
+# With stream=True we can start synthesizing speech for the first sentence
+# while the model is still generating the rest of the response, instead of
+# waiting for the full completion before the first gTTS call.
 try:
     client = OpenAI(
         api_key="ddc-a4f-93af1cce14774a6f831d244f4df3eb9e",
         base_url="https://api.a4f.co/v1"
     )
 
-    print("Requesting AI response...")
+    print("Requesting AI response (streaming)...")
 
     response = client.chat.completions.create(
         model="provider-5/gpt-4o-mini",
@@ -45,36 +130,78 @@ try:
         ],
         temperature=0.7,
         max_tokens=50,
-        stream=False
+        stream=True
     )
 
-    # Extract the AI's text response
-    ai_response_text = response.choices[0].message.content
-    print("\n--- AI Response Text ---")
-    print(ai_response_text)
-    print("------------------------")
+    # --- 3. Stream tokens into sentence buffers and dispatch TTS per sentence ---
+    # The user's question gives us a cheap default for short responses.
+    user_lang = detect_language(user_input)
+    detected_lang = user_lang
+    lang_resolved = False
 
-    # --- 3. Language Detection ---
-    detected_lang = 'en' # Default to English
-    try:
-        detected_lang = detect(ai_response_text)
-        print(f"Language Detected: {detected_lang}")
-    except LangDetectException:
-        print(f"Warning: Could not reliably detect language. Defaulting to '{detected_lang}'.")
-    except Exception as e:
-        print(f"Warning: Language detection failed with error: {e}. Defaulting to '{detected_lang}'.")
+    buffer = ""
+    full_text_parts = []
+    tts_futures = []  # Ordered (submission order == playback order)
+
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        for chunk in response:
+            delta = chunk.choices[0].delta.content if chunk.choices else None
+            if not delta:
+                continue
+            buffer += delta
+            full_text_parts.append(delta)
+
+            # Detect the language once, as soon as we have enough text
+            if not lang_resolved and len(buffer) >= 80:
+                detected_lang = detect_language(buffer, user_lang)
+                lang_resolved = True
+
+            # Flush every completed sentence to a TTS worker
+            parts = SENTENCE_END_RE.split(buffer)
+            if len(parts) > 1:
+                for sentence in parts[:-1]:
+                    sentence = sentence.strip()
+                    if not sentence:
+                        continue
+                    if not lang_resolved:
+                        detected_lang = detect_language(buffer, user_lang)
+                        lang_resolved = True
+                    tts_futures.append(executor.submit(synthesize_sentence, sentence, detected_lang))
+                buffer = parts[-1]
+
+        ai_response_text = "".join(full_text_parts).strip()
+        if not ai_response_text:
+            print("\n❌ The API returned an empty response.")
+            sys.exit(1)
+
+        print("\n--- AI Response Text ---")
+        print(ai_response_text)
+        print("------------------------")
+
+        # Flush whatever is left in the buffer (last sentence / fragment)
+        remainder = buffer.strip()
+        if remainder:
+            if not lang_resolved:
+                detected_lang = detect_language(ai_response_text, user_lang)
+                lang_resolved = True
+            tts_futures.append(executor.submit(synthesize_sentence, remainder, detected_lang))
+
+        # --- 4. Concatenate MP3 fragments in order ---
+        # MP3 frames are concatenable, so appending the fragments back-to-back
+        # in submission order yields one playable file.
+        with open(output_filename, "wb") as out:
+            for future in tts_futures:
+                out.write(future.result())
+
+    if use_cache:
+        evict_tts_cache()
 
-    # --- 4. Convert Text to Speech (gTTS) ---
-    tts = gTTS(text=ai_response_text, lang=detected_lang)
-    tts.save(output_filename)
-    
     # --- 5. Confirmation ---
     print(f"\n✅ Success! The audio file was generated in language '{detected_lang}'.")
-    
+
 except Exception as e:
     print(f"\n❌ An error occurred during API or file generation: {e}")
     # Cleanup file on error
     if 'output_filename' in locals() and os.path.exists(output_filename):
         os.remove(output_filename)
     sys.exit(1) # Exit with an error code if the API/generation failed
-
@@ -2,7 +2,12 @@
 
 import sys
 import os
-from openai import OpenAI
+import mmap
+import asyncio
+import hashlib
+from io import BytesIO
+from pathlib import Path
+from openai import OpenAI, AsyncOpenAI
 
 # --- Configuration ---
 API_KEY = "ddc-a4f-93af1cce14774a6f831d244f4df3eb9e"
@@ -10,11 +15,104 @@ BASE_URL = "https://api.a4f.co/v1"
 MODEL = "provider-5/whisper-1"
 AUDIO_DIR = "storage/documents"
 
+# Files above this size are mmap'd instead of read into memory for upload
+MMAP_THRESHOLD = 10 * 1024 * 1024
+
+# Audio longer than this is split on silence and transcribed concurrently
+MAX_CHUNK_MS = 30_000
+CHUNK_CONCURRENCY = 5
+
+# Transcripts are cached by audio content hash: re-running on the same file
+# (e.g. during development) never hits the network twice
+WHISPER_CACHE_DIR = Path.home() / ".steveai" / "whisper_cache"
+BIG_FILE_BYTES = 100 * 1024 * 1024
+
+# One client for the whole process: reuses the TLS connection instead of
+# paying a fresh handshake on every transcription call.
+client = OpenAI(api_key=API_KEY, base_url=BASE_URL)
+
+def audio_fingerprint(path):
+    """
+    Content hash of the audio file (streamed in 1 MiB blocks). Files over
+    100 MB are fingerprinted by size + first/last MiB — a quick near-unique
+    signature without reading the whole file.
+    """
+    size = os.path.getsize(path)
+    h = hashlib.sha256()
+    block = 1024 * 1024
+    with open(path, "rb") as f:
+        if size > BIG_FILE_BYTES:
+            h.update(str(size).encode())
+            h.update(f.read(block))
+            f.seek(-block, os.SEEK_END)
+            h.update(f.read(block))
+        else:
+            for chunk in iter(lambda: f.read(block), b""):
+                h.update(chunk)
+    return h.hexdigest()
+
+
+def cache_transcript(cache_path, text):
+    # Never cache an empty transcript: a blank file here would make every
+    # future run on the same audio short-circuit to printing nothing.
+    if not text or not text.strip():
+        return
+    try:
+        WHISPER_CACHE_DIR.mkdir(parents=True, exist_ok=True)
+        cache_path.write_text(text)
+    except OSError as e:
+        print(f"Warning: Could not cache transcript: {e}")
+
+
+def transcribe_long_audio(audio):
+    """
+    Splits long audio on silence into <=30s chunks and transcribes them
+    concurrently (bounded to CHUNK_CONCURRENCY in-flight requests).
+    Throughput scales near-linearly with chunk count on the remote endpoint.
+    """
+    from pydub.silence import split_on_silence
+
+    chunks = split_on_silence(audio, min_silence_len=500, silence_thresh=-40, keep_silence=200)
+    if not chunks:
+        chunks = [audio]
+
+    # Coalesce adjacent chunks so each request carries up to ~30s of audio
+    packed = []
+    for chunk in chunks:
+        if packed and len(packed[-1]) + len(chunk) <= MAX_CHUNK_MS:
+            packed[-1] += chunk
+        else:
+            packed.append(chunk)
+
+    print(f"Long audio: {len(audio) / 1000:.0f}s split into {len(packed)} chunk(s).")
+
+    async def run_chunks():
+        async_client = AsyncOpenAI(api_key=API_KEY, base_url=BASE_URL)
+        sem = asyncio.Semaphore(CHUNK_CONCURRENCY)
+
+        async def transcribe_chunk(idx, segment):
+            buf = BytesIO()
+            segment.export(buf, format="wav")
+            buf.seek(0)
+            async with sem:
+                response = await async_client.audio.transcriptions.create(
+                    model=MODEL,
+                    file=(f"chunk_{idx}.wav", buf)
+                )
+            return idx, response.text
+
+        results = await asyncio.gather(*(transcribe_chunk(i, s) for i, s in enumerate(packed)))
+        # Reassemble in offset order
+        return " ".join(text for _, text in sorted(results))
+
+    return asyncio.run(run_chunks())
+
+
 def transcribe_audio(audio_filename):
     """
     Handles API call to transcribe the given audio file.
     """
-    
+
     # 1. Construct full path and check file existence
     full_path = os.path.join(AUDIO_DIR, audio_filename)
     
@@ -26,29 +124,101 @@ def transcribe_audio(audio_filename):
     print(f"--- Starting Transcription of: {audio_filename} ---")
     print(f"Model: {MODEL}")
 
-    # 2. Initialize the OpenAI client
+    # 2. Content-hash cache: identical audio never gets transcribed twice
+    cache_path = WHISPER_CACHE_DIR / f"{audio_fingerprint(full_path)}.txt"
+    if cache_path.exists():
+        print("\n✅ Transcription Complete (cached):")
+        print("---------------------------------")
+        print(cache_path.read_text())
+        print("---------------------------------")
+        return
+
+    # 3. Long audio: split on silence and run chunks concurrently
     try:
-        client = OpenAI(api_key=API_KEY, base_url=BASE_URL)
+        from pydub import AudioSegment
+        audio = AudioSegment.from_file(full_path)
+        if len(audio) > MAX_CHUNK_MS:
+            transcribed_text = transcribe_long_audio(audio)
+            cache_transcript(cache_path, transcribed_text)
+            print("\n✅ Transcription Complete:")
+            print("---------------------------------")
+            print(transcribed_text)
+            print("---------------------------------")
+            return
+    except ImportError:
+        pass  # pydub not installed—use the single-request path
     except Exception as e:
-        print(f"❌ Error initializing OpenAI client: {e}")
-        return
+        print(f"Warning: Could not split audio ({e}). Using single request.")
 
-    # 3. Call the transcription API
+    # 4. Call the transcription API (streaming)
     try:
         # The 'audio.transcriptions.create' method handles the file upload automatically
         with open(full_path, "rb") as audio_file:
-            response = client.audio.transcriptions.create(
-                model=MODEL,
-                file=audio_file
-            )
+            upload = audio_file
+            file_map = None
+            if os.fstat(audio_file.fileno()).st_size > MMAP_THRESHOLD:
+                # mmap large files so the upload reads pages on demand
+                # instead of pulling the whole file into memory
+                file_map = mmap.mmap(audio_file.fileno(), 0, access=mmap.ACCESS_READ)
+                upload = (os.path.basename(full_path), file_map)
 
-        # 4. Extract and print the transcribed text
-        transcribed_text = response.text
-        
-        print("\n✅ Transcription Complete:")
-        print("---------------------------------")
-        print(transcribed_text)
-        print("---------------------------------")
+            try:
+                print("\n✅ Transcription:")
+                print("---------------------------------")
+                transcribed_parts = []
+                final_text = None
+                try:
+                    response = client.audio.transcriptions.create(
+                        model=MODEL,
+                        file=upload,
+                        response_format="text",
+                        stream=True
+                    )
+
+                    # 5. Print partial text as it arrives (lower perceived latency)
+                    for event in response:
+                        delta = getattr(event, "delta", None)
+                        if delta:
+                            sys.stdout.write(delta)
+                            sys.stdout.flush()
+                            transcribed_parts.append(delta)
+                        elif getattr(event, "text", None):
+                            final_text = event.text
+                except Exception as stream_error:
+                    # The endpoint may reject stream=True outright, or send
+                    # a non-SSE body the SDK can't iterate — reasons to fall
+                    # back below, not to fail audio that transcribes fine
+                    # unstreamed.
+                    print(f"(streaming unavailable: {stream_error} — retrying without)")
+                    transcribed_parts = []
+                    final_text = None
+
+                transcribed_text = final_text or "".join(transcribed_parts)
+
+                if not transcribed_text.strip():
+                    # Streaming errored out, or the endpoint silently
+                    # ignored stream=True (whisper-1 doesn't stream on
+                    # every OpenAI-compatible endpoint): redo the call as
+                    # a plain request instead of reporting (and caching)
+                    # an empty transcript.
+                    (file_map if file_map is not None else audio_file).seek(0)
+                    response = client.audio.transcriptions.create(
+                        model=MODEL,
+                        file=upload,
+                        response_format="text",
+                    )
+                    transcribed_text = (
+                        response if isinstance(response, str)
+                        else (getattr(response, "text", "") or "")
+                    )
+                    sys.stdout.write(transcribed_text)
+                    sys.stdout.flush()
+
+                print("\n---------------------------------")
+                cache_transcript(cache_path, transcribed_text)
+            finally:
+                if file_map is not None:
+                    file_map.close()
 
     except Exception as e:
         print(f"❌ An error occurred during transcription: {e}")
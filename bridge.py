@@ -1,12 +1,26 @@
+import re
 import serial
 import time
 import asyncio
+import threading
+
+# Prefer the libuv event loop when available (faster queue/future machinery)
+try:
+    import uvloop
+    asyncio.set_event_loop_policy(uvloop.EventLoopPolicy())
+except ImportError:
+    pass
 
 # --- CONFIGURATION ---
 # *** IMPORTANT: Change 'COMX' to your specific Bluetooth COM Port ***
 BLUETOOTH_PORT = 'COMX' # <--- CHANGE THIS
 BAUD_RATE = 9600 # Must match the Arduino code
 
+# Alert keywords the Arduino may emit. Compiled once at module load: one
+# DFA scan per message instead of a substring check per keyword, and the
+# match pattern stays O(len(text)) as the vocabulary grows.
+ALERT_RE = re.compile(r"FIRE DETECTED|SMOKE|LOW BATTERY|OBSTACLE")
+
 class RoverBridge:
     """
     Manages the synchronous serial connection to the Arduino Rover.
@@ -16,71 +30,134 @@ class RoverBridge:
     def __init__(self):
         self.rover = None
         self.is_connected = False
-        self.feedback_queue = asyncio.Queue()
-        self._loop = asyncio.get_event_loop()
+        # Bounded: if nobody is draining feedback, old lines are dropped
+        # instead of growing the queue without limit.
+        self.feedback_queue = asyncio.Queue(maxsize=100)
+        # Bound lazily to the running loop on first async use: the bridge
+        # is often constructed before asyncio.run(), and a loop captured
+        # here would be one that never runs.
+        self._loop = None
+        # Lines read before any async consumer exists are parked here by
+        # the reader thread and flushed once the loop is bound.
+        self._early_lines = []
+        self._reader_thread = None
+        self._command_queue = asyncio.Queue()
+        self._writer_task = None
         self.connect()
 
     def connect(self):
         """Initializes the serial connection synchronously."""
         try:
             # 1. Open the Bluetooth/Serial connection
-            self.rover = serial.Serial(BLUETOOTH_PORT, BAUD_RATE, timeout=0) # Non-blocking timeout
+            # Blocking reads with a 1s timeout: the reader thread sleeps in
+            # readline() until data (or the timeout) arrives, instead of
+            # polling in_waiting 20x/s.
+            self.rover = serial.Serial(BLUETOOTH_PORT, BAUD_RATE, timeout=1)
             time.sleep(2) # Give it a moment to connect and reset the Arduino
             self.is_connected = True
             print(f"✅ RoverBridge: Successfully connected to Rover on {BLUETOOTH_PORT}.")
 
+            # 2. Start the dedicated reader thread for Arduino feedback
+            self._reader_thread = threading.Thread(target=self._reader, daemon=True)
+            self._reader_thread.start()
+
         except serial.SerialException as e:
             print(f"❌ RoverBridge ERROR: Could not open port {BLUETOOTH_PORT}. Check pairing and port name.")
             print(e)
             self.is_connected = False
 
-    def send_command_sync(self, command_char):
-        """Sends a single character command to the Arduino (BLOCKING)."""
+    def send_command_sync(self, commands):
+        """Sends one or more command characters to the Arduino (BLOCKING)."""
         if not self.is_connected:
-            print(f"[RoverBridge] Not connected. Would have sent: '{command_char}'")
+            print(f"[RoverBridge] Not connected. Would have sent: '{commands}'")
             return
 
         try:
-            self.rover.write(command_char.encode()) # Commands must be sent as bytes
-            print(f"[RoverBridge] -> Sent command: '{command_char}'")
+            self.rover.write(commands.encode()) # Commands must be sent as bytes
+            self.rover.flush() # One explicit flush per batch, not per byte
+            print(f"[RoverBridge] -> Sent command(s): '{commands}'")
         except Exception as e:
             print(f"[RoverBridge] Error sending command: {e}")
 
     async def send_command(self, command_char):
-        """Sends a command using a separate thread (ASYNC)."""
-        await self._loop.run_in_executor(
-            None, # Use default executor (ThreadPoolExecutor)
-            self.send_command_sync,
-            command_char.upper()
-        )
-
-    async def listen_for_feedback(self):
-        """Checks the buffer and puts any data from Arduino into the queue (ASYNC)."""
-        if not self.is_connected:
-            return
-
-        # Use an asyncio.to_thread task to safely run the blocking readline loop
-        await self._loop.run_in_executor(
-            None,
-            self._listen_for_feedback_sync
-        )
-
-    def _listen_for_feedback_sync(self):
-        """The actual blocking loop to read serial data (SYNC)."""
+        """Enqueues a command; a single writer task drains bursts (ASYNC).
+
+        Commands queued while a write is in flight are coalesced into one
+        serial write, so a burst of N commands costs one executor hop
+        instead of N.
+        """
+        if self._loop is None:
+            self._loop = asyncio.get_running_loop()
+        if self._writer_task is None:
+            self._writer_task = asyncio.ensure_future(self._command_writer())
+
+        sent = asyncio.Event()
+        await self._command_queue.put((command_char.upper(), sent))
+        await sent.wait()
+
+    async def _command_writer(self):
+        """Long-lived writer task: drains the command queue in batches."""
+        loop = asyncio.get_running_loop()
+        while True:
+            char, sent = await self._command_queue.get()
+            batch = [(char, sent)]
+            while not self._command_queue.empty():
+                batch.append(self._command_queue.get_nowait())
+
+            payload = "".join(c for c, _ in batch)
+            await loop.run_in_executor(
+                None, # Use default executor (ThreadPoolExecutor)
+                self.send_command_sync,
+                payload
+            )
+            for _, done in batch:
+                done.set()
+
+    def _reader(self):
+        """Dedicated reader thread: blocks in readline() until data arrives.
+
+        Zero CPU while idle, and each Arduino line is delivered the moment
+        its newline comes in rather than on the next 50 ms poll tick.
+        """
         while self.is_connected:
             try:
-                if self.rover.in_waiting > 0:
-                    feedback = self.rover.readline().decode('utf-8').strip()
+                line = self.rover.readline()  # Blocks up to the 1s timeout
+                if line:
+                    feedback = line.decode('utf-8').strip()
                     if feedback:
                         # Put feedback into the async queue for the AI script to process
-                        self._loop.call_soon_threadsafe(self.feedback_queue.put_nowait, feedback)
-                time.sleep(0.05) # Poll frequency
+                        loop = self._loop
+                        if loop is None:
+                            # No loop bound yet (bridge built before
+                            # asyncio.run): park the line instead of
+                            # queueing a callback on a loop that never runs
+                            self._early_lines.append(feedback)
+                            del self._early_lines[:-100]  # Keep it bounded
+                            continue
+                        while self._early_lines:
+                            loop.call_soon_threadsafe(
+                                self._enqueue_feedback, self._early_lines.pop(0))
+                        loop.call_soon_threadsafe(self._enqueue_feedback, feedback)
             except Exception as e:
-                print(f"[RoverBridge] Error receiving data: {e}")
+                if self.is_connected:
+                    print(f"[RoverBridge] Error receiving data: {e}")
                 break # Exit the loop on error
 
+    def _enqueue_feedback(self, feedback):
+        """Runs on the event loop; drops the oldest line when the queue is full."""
+        try:
+            self.feedback_queue.put_nowait(feedback)
+        except asyncio.QueueFull:
+            try:
+                self.feedback_queue.get_nowait()
+            except asyncio.QueueEmpty:
+                pass
+            self.feedback_queue.put_nowait(feedback)
+
     async def get_feedback(self):
         """Async method to retrieve feedback from the queue."""
+        if self._loop is None:
+            self._loop = asyncio.get_running_loop()
         return await self.feedback_queue.get()
 
     def close(self):
@@ -105,20 +182,20 @@ if __name__ == "__main__":
         await bridge.send_command('S') # Stop
         await asyncio.sleep(1)
 
-        # Start listening for feedback in the background
-        listener_task = asyncio.create_task(bridge.listen_for_feedback())
-
+        # The reader thread (started in connect) is already listening
         # Check for feedback for a few seconds
         for _ in range(5):
             try:
                 # Get feedback from the queue, with a timeout
                 feedback = await asyncio.wait_for(bridge.get_feedback(), timeout=0.5)
-                print(f"<- ROVER FEEDBACK (Test): {feedback}")
+                if feedback and (m := ALERT_RE.search(feedback)):
+                    print(f"🚨 ROVER ALERT (Test): {m.group()} in '{feedback}'")
+                else:
+                    print(f"<- ROVER FEEDBACK (Test): {feedback}")
             except asyncio.TimeoutError:
                 # No feedback in the last 0.5s
                 pass
 
-        listener_task.cancel()
         bridge.close()
         print("Test complete.")
 
@@ -1,24 +1,72 @@
 #!/usr/bin/env python
 import asyncio
+
+# libuv-based event loop: lower per-call overhead for the httpx/AsyncOpenAI
+# traffic and queue machinery. Optional—stdlib loop is used if unavailable.
+try:
+    import uvloop
+    asyncio.set_event_loop_policy(uvloop.EventLoopPolicy())
+except ImportError:
+    pass
 import os
 import sys
 import json
+import time
+import random
+from collections import deque
 from pathlib import Path
-from typing import List, Optional
-import toml
+from typing import List, Optional, TYPE_CHECKING
+import toml  # Only used for writing in `init`
+try:
+    import tomllib  # Python 3.11+: C-accelerated stdlib parser for reads
+except ImportError:
+    tomllib = None
 from pydantic import BaseModel, Field
 from rich import print as rprint, console
 from rich.prompt import Prompt, Confirm
 from rich.table import Table
-from git import Repo  # Optional
-import requests  # For sync usage
 
-# AI Backend
-from openai import AsyncOpenAI
-import httpx  # For timeout config
+# Heavy modules (git, requests, httpx, openai, tiktoken) are imported lazily
+# inside the code paths that need them: cold `import git`/`import openai`
+# each cost hundreds of ms, and commands like `init` or `--help` use neither.
+if TYPE_CHECKING:
+    from git import Repo
+    from openai import AsyncOpenAI
 
 console = console.Console()
 
+# One pooled session for all sync HTTP (usage/models): keep-alive avoids a
+# fresh TCP+TLS handshake per request. Created on first use.
+_http_session = None
+
+def get_http_session():
+    global _http_session
+    if _http_session is None:
+        import requests  # For sync usage
+        _http_session = requests.Session()
+    return _http_session
+
+# On-disk TTL cache for slow-changing API responses (models, usage)
+API_CACHE_DIR = Path.home() / ".steveai" / "cache"
+MODELS_CACHE_TTL = 900  # Model list changes on the order of hours
+USAGE_CACHE_TTL = 30    # Usage counters move fast—keep this short
+
+def cache_read(name: str, ttl: float):
+    cache_file = API_CACHE_DIR / f"{name}.json"
+    try:
+        if time.time() - cache_file.stat().st_mtime < ttl:
+            return json.loads(cache_file.read_text())
+    except (OSError, json.JSONDecodeError):
+        pass
+    return None
+
+def cache_write(name: str, data):
+    try:
+        API_CACHE_DIR.mkdir(parents=True, exist_ok=True)
+        (API_CACHE_DIR / f"{name}.json").write_text(json.dumps(data))
+    except OSError:
+        pass
+
 class Config(BaseModel):
     a4f_base_url: str = "https://api.a4f.co/v1"
     a4f_api_keys: List[str] = Field(default_factory=lambda: ["free"])
@@ -26,89 +74,378 @@ class Config(BaseModel):
 def load_config() -> Config:
     config_path = Path.home() / ".steveai" / "config.toml"
     if config_path.exists():
-        data = toml.load(config_path)
+        # load_config runs on every CLI invocation—prefer the stdlib C parser
+        if tomllib is not None:
+            data = tomllib.loads(config_path.read_text())
+        else:
+            data = toml.load(config_path)
         # Filter out dummy 'free' keys for safety
         if "a4f_api_keys" in data:
             data["a4f_api_keys"] = [k for k in data["a4f_api_keys"] if k != "free"]
         return Config(**data)
     return Config()
 
+# Repo objects are expensive to construct (git dir discovery, config parse);
+# cache one per project dir for the life of the process. The REPL creates a
+# fresh Session per command, so this saves a re-open every turn.
+_repo_cache: dict = {}
+
+def get_repo(project_dir: Path) -> "Repo":
+    repo = _repo_cache.get(project_dir)
+    if repo is None:
+        from git import Repo  # Optional
+        repo = _repo_cache.setdefault(project_dir, Repo(project_dir))
+    return repo
+
 class Session:
+    MAX_CONTEXT_TOKENS = 4000
+
     def __init__(self, project_dir: Path):
         self.project_dir = project_dir
         self.history: List[str] = []
-        self.git_repo: Optional[Repo] = None
+        self.git_repo: Optional["Repo"] = None
         if (project_dir / ".git").exists():
-            self.git_repo = Repo(project_dir)
+            self.git_repo = get_repo(project_dir)
+        # Rolling token-budgeted context window: lines are pre-formatted on
+        # append and old lines drop off once the budget is exceeded, so
+        # get_context never rebuilds or mis-truncates (chars != tokens).
+        self._ctx = deque()
+        self._ctx_tokens = 0
+        import tiktoken  # Token-accurate context budgeting
+        self._enc = tiktoken.get_encoding("cl100k_base")
 
     def add_to_history(self, role: str, content: str):
         self.history.append({"role": role, "content": content})
+        line = f"{role}: {content}"
+        n_tok = len(self._enc.encode(line))
+        self._ctx.append((line, n_tok))
+        self._ctx_tokens += n_tok
+        while len(self._ctx) > 1 and self._ctx_tokens > self.MAX_CONTEXT_TOKENS:
+            _, dropped = self._ctx.popleft()
+            self._ctx_tokens -= dropped
 
-    def get_context(self, max_tokens: int = 4000) -> str:
-        context = "\n".join([f"{msg['role']}: {msg['content']}" for msg in self.history[-10:]])
-        return context[:max_tokens]
+    def get_context(self, max_tokens: int = MAX_CONTEXT_TOKENS) -> str:
+        return "\n".join(line for line, _ in self._ctx)
 
 class AIBackend:
+    BATCH_MAX_PROMPTS = 8    # Max prompts packed into one request
+    BATCH_WINDOW_S = 0.05    # How long the batcher waits to coalesce more prompts
+
     def __init__(self, config: Config):
         self.config = config
         self.base_url = config.a4f_base_url
-        self.current_key_index = 0
+        self._usage_cache: dict = {}  # api_key -> (fetch time, usage snapshot)
+        self._batch_queue: Optional[asyncio.Queue] = None
+        self._batcher_task = None
+        self._key_cooldown: dict = {}  # api_key -> monotonic time it becomes usable again
+        self._chat_semaphore = asyncio.Semaphore(10)  # Bound concurrent in-flight requests
+        self._clients: dict = {}  # api_key -> (owner loop, AsyncOpenAI)
+        self._loop = None  # Loop the primitives above are bound to
+
+    def _ensure_loop_state(self):
+        """(Re)creates loop-bound state when running under a new loop.
+
+        The backend outlives any single asyncio.run(), but the semaphore,
+        batch queue and worker task are tied to the loop that made them:
+        reused from a later loop they raise or hang (the old worker died
+        with its loop while the queue would keep accepting work).
+        """
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            self._loop = loop
+            self._chat_semaphore = asyncio.Semaphore(10)
+            self._batch_queue = None
+            self._batcher_task = None
+
+    def get_usage(self, api_key: str, refresh: bool = False) -> dict:
+        cache_name = f"usage_{api_key[:8]}"
+        if not refresh:
+            cached = cache_read(cache_name, USAGE_CACHE_TTL)
+            if cached is not None:
+                return cached
 
-    def get_usage(self, api_key: str) -> dict:
         headers = {"Authorization": f"Bearer {api_key}"}
         try:
-            resp = requests.get(f"{self.base_url}/usage?section=rate_limits_and_restrictions", headers=headers, timeout=10)
+            resp = get_http_session().get(f"{self.base_url}/usage?section=rate_limits_and_restrictions", headers=headers, timeout=10)
             if resp.status_code == 200:
-                return resp.json()
+                usage = resp.json()
+                cache_write(cache_name, usage)
+                return usage
         except:
             pass
         return {"requests_per_minute_remaining": 0, "requests_per_day_remaining": 0}
 
+    def _fresh_usage(self, api_key: str) -> dict:
+        """In-memory usage snapshot, refreshed at most every 30 s per key."""
+        ts, usage = self._usage_cache.get(api_key, (0.0, {}))
+        if time.time() - ts > 30:
+            usage = self.get_usage(api_key)
+            self._usage_cache[api_key] = (time.time(), usage)
+        return usage
+
     def select_best_key(self) -> str:
         if not self.config.a4f_api_keys:
             raise ValueError("No valid API keys configured!")
-        # Simple round-robin if usage fetch fails
-        self.current_key_index = (self.current_key_index + 1) % len(self.config.a4f_api_keys)
-        return self.config.a4f_api_keys[self.current_key_index - 1]
+        keys = self.config.a4f_api_keys
+        if len(keys) == 1:
+            return keys[0]
+
+        # Skip keys still cooling down after a 429
+        now = time.monotonic()
+        available = [k for k in keys if self._key_cooldown.get(k, 0) <= now]
+        if not available:
+            # Every key is cooling down—take the one that recovers soonest
+            return min(keys, key=lambda k: self._key_cooldown.get(k, 0))
+
+        # Pick the key with the most RPM headroom left
+        return max(available, key=lambda k: self._fresh_usage(k).get("requests_per_minute_remaining", 0))
 
     async def chat(self, prompt: str, model: str = "gpt-4o-mini", session: Session = None, max_tokens: int = 1000) -> str:
         context = session.get_context() if session else ""
         full_prompt = f"{context}\n\nUser: {prompt}" if context else prompt
 
-        api_key = self.select_best_key()
-        timeout = httpx.Timeout(connect=30.0, read=60.0, write=60.0, pool=60.0)
-        client = AsyncOpenAI(base_url=self.base_url, api_key=api_key, timeout=timeout)
+        last_error = None
+        self._ensure_loop_state()
+        async with self._chat_semaphore:
+            for attempt in range(4):
+                # Key selection may hit the usage endpoint synchronously
+                # (requests, up to 10 s) — keep that off the event loop
+                api_key = await asyncio.to_thread(self.select_best_key)
+                client = self._make_client(api_key)
+
+                try:
+                    resp = await client.chat.completions.create(
+                        model=model, messages=[{"role": "user", "content": full_prompt}], max_tokens=max_tokens
+                    )
+                    return resp.choices[0].message.content
+                except Exception as e:
+                    if "rate" in str(e).lower() or "429" in str(e):
+                        # Cool this key down so rotation skips it for a while
+                        self._key_cooldown[api_key] = time.monotonic() + 60
+                        last_error = e
+                        delay = min(2 ** attempt, 30) + random.random()
+                        rprint(f"[yellow]Key limited—cooling down, retrying in {delay:.1f}s...[/yellow]")
+                        await asyncio.sleep(delay)
+                        continue
+                    raise e
+        raise last_error
+
+    async def chat_many(self, prompts: List[str], model: str = "gpt-4o-mini", max_tokens: int = 1000) -> List[str]:
+        """Packs N independent prompts into one completion request.
+
+        Free-tier keys are RPM-limited long before they are token-limited, so
+        numbering the prompts into a single message multiplies effective
+        throughput. Falls back to one request per prompt if the model's
+        answer can't be split back apart.
+        """
+        if len(prompts) == 1:
+            return [await self.chat(prompts[0], model, max_tokens=max_tokens)]
+
+        packed = "\n".join(f"###{i}\n{p}" for i, p in enumerate(prompts))
+        client = self._make_client(await asyncio.to_thread(self.select_best_key))
 
         try:
             resp = await client.chat.completions.create(
-                model=model, messages=[{"role": "user", "content": full_prompt}], max_tokens=max_tokens
+                model=model,
+                messages=[
+                    {"role": "system", "content": "Answer each numbered prompt separately, prefix each answer with '###<i>' on its own line."},
+                    {"role": "user", "content": packed},
+                ],
+                max_tokens=max_tokens * len(prompts),
             )
-            return resp.choices[0].message.content
+            import re
+            pieces = re.split(r"###\d+\n?", resp.choices[0].message.content)
+            answers = [p.strip() for p in pieces if p.strip()]
+            if len(answers) == len(prompts):
+                return answers
+            rprint("[yellow]Batched answer didn't split cleanly—retrying prompts individually.[/yellow]")
         except Exception as e:
-            if "rate" in str(e).lower() or "429" in str(e):
-                rprint(f"[yellow]Key limited—rotating...[/yellow]")
-                # Retry with next key
-                return await self.chat(prompt, model, session, max_tokens)
-            raise e
+            rprint(f"[yellow]Batched request failed ({str(e)[:50]}...)—retrying prompts individually.[/yellow]")
+
+        return [await self.chat(p, model, max_tokens=max_tokens) for p in prompts]
+
+    def _make_client(self, api_key: str) -> "AsyncOpenAI":
+        """Returns the cached client for this key, creating it on first use.
+
+        Reusing one AsyncOpenAI (and its httpx pool) per key amortizes the
+        TCP+TLS handshake across requests instead of paying it every call.
+        The cache is scoped to the running loop: every CLI command runs its
+        own asyncio.run(), and a pooled connection whose transport belongs
+        to a previous, now-closed loop fails with "Event loop is closed".
+        """
+        loop = asyncio.get_running_loop()
+        entry = self._clients.get(api_key)
+        if entry is not None:
+            owner, client = entry
+            if owner is loop:
+                return client
+            # Stale client from a finished loop: its sockets died with the
+            # loop, so just drop the reference and build a fresh one.
+        from openai import AsyncOpenAI
+        import httpx  # For timeout config
+        timeout = httpx.Timeout(connect=30.0, read=60.0, write=60.0, pool=60.0)
+        client = AsyncOpenAI(
+            base_url=self.base_url, api_key=api_key, timeout=timeout, max_retries=0,
+            http_client=httpx.AsyncClient(
+                timeout=timeout,
+                limits=httpx.Limits(max_keepalive_connections=20, max_connections=100),
+            ),
+        )
+        self._clients[api_key] = (loop, client)
+        return client
+
+    async def aclose(self):
+        """Closes clients owned by the current loop (call before it exits)."""
+        loop = asyncio.get_running_loop()
+        for api_key, (owner, client) in list(self._clients.items()):
+            if owner is loop:
+                await client.close()
+                del self._clients[api_key]
+
+    async def submit_batch(self, batch_requests: List[dict]) -> str:
+        """Submits chat requests through the Batch API; returns the batch id.
+
+        Batch jobs are ~50% cheaper and draw from a separate rate-limit pool
+        (24 h completion window), so scripted bulk generate/edit runs don't
+        eat the interactive RPM budget. Each entry needs 'custom_id' and
+        'body' (a chat.completions payload).
+        """
+        import tempfile
+        client = self._make_client(await asyncio.to_thread(self.select_best_key))
+
+        lines = [
+            json.dumps({
+                "custom_id": r["custom_id"],
+                "method": "POST",
+                "url": "/v1/chat/completions",
+                "body": r["body"],
+            })
+            for r in batch_requests
+        ]
+        with tempfile.NamedTemporaryFile("w", suffix=".jsonl", delete=False) as tmp:
+            tmp.write("\n".join(lines) + "\n")
+            tmp_path = tmp.name
 
-    def list_models(self, limit: int = 20) -> List[dict]:
+        try:
+            with open(tmp_path, "rb") as f:
+                batch_file = await client.files.create(file=f, purpose="batch")
+            batch = await client.batches.create(
+                input_file_id=batch_file.id,
+                endpoint="/v1/chat/completions",
+                completion_window="24h",
+            )
+        finally:
+            os.unlink(tmp_path)
+
+        rprint(f"[green]Batch submitted: {batch.id}[/green]")
+        return batch.id
+
+    async def wait_batch(self, batch_id: str, poll_s: float = 5.0) -> dict:
+        """Polls a batch until it finishes; returns {custom_id: response text}."""
+        client = self._make_client(await asyncio.to_thread(self.select_best_key))
+
+        delay = poll_s
+        while True:
+            batch = await client.batches.retrieve(batch_id)
+            if batch.status in ("completed", "failed", "expired", "cancelled"):
+                break
+            rprint(f"[dim]Batch {batch_id}: {batch.status}—waiting {delay:.0f}s...[/dim]")
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, 300)
+
+        if batch.status != "completed" or not batch.output_file_id:
+            raise RuntimeError(f"Batch {batch_id} ended with status '{batch.status}'")
+
+        content = await client.files.content(batch.output_file_id)
+        results = {}
+        for line in content.text.splitlines():
+            if not line.strip():
+                continue
+            entry = json.loads(line)
+            body = entry.get("response", {}).get("body", {})
+            choices = body.get("choices", [])
+            if choices:
+                results[entry["custom_id"]] = choices[0]["message"]["content"]
+        return results
+
+    async def chat_batch_api(self, prompt: str, model: str, custom_id: str, max_tokens: int = 1000) -> str:
+        """One-shot helper: submit a single prompt as a batch job and wait for it."""
+        batch_id = await self.submit_batch([{
+            "custom_id": custom_id,
+            "body": {
+                "model": model,
+                "messages": [{"role": "user", "content": prompt}],
+                "max_tokens": max_tokens,
+            },
+        }])
+        results = await self.wait_batch(batch_id)
+        return results[custom_id]
+
+    async def chat_queued(self, prompt: str, model: str = "gpt-4o-mini", max_tokens: int = 1000) -> str:
+        """Like chat(), but coalesces concurrent calls into batched requests.
+
+        Prompts submitted within BATCH_WINDOW_S of each other ride the same
+        HTTP request (up to BATCH_MAX_PROMPTS), each resolving its own future.
+        """
+        self._ensure_loop_state()
+        if self._batch_queue is None:
+            self._batch_queue = asyncio.Queue()
+            self._batcher_task = asyncio.create_task(self._batch_worker())
+
+        future: asyncio.Future = asyncio.get_running_loop().create_future()
+        await self._batch_queue.put((prompt, model, max_tokens, future))
+        return await future
+
+    async def _batch_worker(self):
+        while True:
+            prompt, model, max_tokens, future = await self._batch_queue.get()
+            pending = [(prompt, future)]
+            # Coalesce whatever else arrives inside the batching window
+            deadline = asyncio.get_running_loop().time() + self.BATCH_WINDOW_S
+            while len(pending) < self.BATCH_MAX_PROMPTS:
+                remaining = deadline - asyncio.get_running_loop().time()
+                if remaining <= 0:
+                    break
+                try:
+                    p, _, _, f = await asyncio.wait_for(self._batch_queue.get(), remaining)
+                    pending.append((p, f))
+                except asyncio.TimeoutError:
+                    break
+
+            try:
+                answers = await self.chat_many([p for p, _ in pending], model, max_tokens=max_tokens)
+                for (_, f), answer in zip(pending, answers):
+                    if not f.done():
+                        f.set_result(answer)
+            except Exception as e:
+                for _, f in pending:
+                    if not f.done():
+                        f.set_exception(e)
+
+    def list_models(self, limit: int = 20, refresh: bool = False) -> List[dict]:
         """Dynamic fetch from /v1/models?plan=free for free tier only."""
         if not self.config.a4f_api_keys:
             rprint("[yellow]No API keys—using verified free models.[/yellow]")
             return self._verified_free_models()[:limit]
-        
+
+        if not refresh:
+            cached = cache_read("models", MODELS_CACHE_TTL)
+            if cached is not None:
+                return cached[:limit]
+
         api_key = self.config.a4f_api_keys[0]
         headers = {"Authorization": f"Bearer {api_key}"}
         params = {"plan": "free"}
         
         try:
-            resp = requests.get(f"{self.base_url}/models", headers=headers, params=params, timeout=30)
+            resp = get_http_session().get(f"{self.base_url}/models", headers=headers, params=params, timeout=30)
             if resp.status_code == 200:
                 data = resp.json()
                 models = data.get("data", [])
                 
+                # Parse (and cache) the full list; the limit is applied on return
                 parsed_models = []
-                for m in models[:limit]:
+                for m in models:
                     model_id = m.get("id", "")
                     if '/' in model_id:
                         provider, name = model_id.split('/', 1)
@@ -121,7 +458,9 @@ class AIBackend:
                         'created': m.get("created", 0) or 0,  # Ensure int for sorting
                         'owned': True  # Free tier
                     })
-                return sorted(parsed_models, key=lambda x: x['created'], reverse=True)
+                parsed_models = sorted(parsed_models, key=lambda x: x['created'], reverse=True)
+                cache_write("models", parsed_models)
+                return parsed_models[:limit]
             else:
                 rprint(f"[yellow]API error {resp.status_code}—using verified free models.[/yellow]")
         except Exception as e:
@@ -144,8 +483,40 @@ class AIBackend:
         ]
 
 # TTS
+import atexit
+import subprocess
+
+_espeak_proc: Optional[subprocess.Popen] = None
+
+def _close_espeak():
+    if _espeak_proc is not None and _espeak_proc.poll() is None:
+        try:
+            _espeak_proc.stdin.close()
+            _espeak_proc.wait(timeout=5)
+        except (OSError, subprocess.TimeoutExpired):
+            _espeak_proc.kill()
+
+atexit.register(_close_espeak)
+
 def text_to_speech(text: str):
-    os.system(f"espeak '{text}'")
+    """Speaks text via a persistent espeak-ng child reading stdin.
+
+    One long-lived process instead of a shell+espeak fork/exec per phrase
+    (~50-150 ms saved each call), and no shell interpolation of the text.
+    """
+    global _espeak_proc
+    if _espeak_proc is None or _espeak_proc.poll() is not None:
+        _espeak_proc = subprocess.Popen(
+            ["espeak-ng", "--stdin", "-v", "en"],
+            stdin=subprocess.PIPE,
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL,
+        )
+    try:
+        _espeak_proc.stdin.write((text.replace("\n", " ") + "\n").encode())
+        _espeak_proc.stdin.flush()
+    except (BrokenPipeError, OSError):
+        _espeak_proc = None  # Child died—respawn on the next call
 
 # CLI
 import typer
@@ -154,6 +525,19 @@ app = typer.Typer(help="SteveAI: Free Tier A4F Models CLI 🚀")
 
 config = load_config()
 backend = AIBackend(config)
+
+def run_async(coro):
+    """asyncio.run wrapper for CLI commands.
+
+    Closes the backend's per-loop clients before the loop exits so pooled
+    sockets never outlive the loop that created them.
+    """
+    async def _runner():
+        try:
+            return await coro
+        finally:
+            await backend.aclose()
+    return asyncio.run(_runner())
 session = None
 
 @app.command()
@@ -170,7 +554,7 @@ def init(add_key: bool = True):
     rprint(f"[green]{len([k for k in data['a4f_api_keys'] if k != 'free'])} valid keys ready![/green]")
 
 @app.command()
-def usage(model: Optional[str] = None):
+def usage(model: Optional[str] = None, refresh: bool = False):
     table = Table(title="A4F Key Usage")
     table.add_column("Key (short)", style="cyan")
     table.add_column("RPM Left", style="green")
@@ -180,17 +564,17 @@ def usage(model: Optional[str] = None):
         table.add_row("N/A", "N/A", "Add keys via 'init'")
     else:
         for key in valid_keys:
-            usage = backend.get_usage(key)
+            usage = backend.get_usage(key, refresh=refresh)
             rpm = usage.get("requests_per_minute_remaining", "?")
             rpd = usage.get("requests_per_day_remaining", "?")
             table.add_row(key[:8] + "...", str(rpm), str(rpd))
     console.print(table)
 
 @app.command()
-def models(limit: int = 15):
+def models(limit: int = 15, refresh: bool = False):
     """List free tier A4F models (live ?plan=free fetch or fallback)."""
     rprint("[bold blue]Loading A4F free tier models...[/bold blue]")
-    free_models = backend.list_models(limit=limit)
+    free_models = backend.list_models(limit=limit, refresh=refresh)
     if not free_models:
         rprint("[red]No models available—check keys/network.[/red]")
         return
@@ -213,7 +597,7 @@ def chat(prompt: str, model: str = "provider-3/gpt-4o-mini", tts: bool = False,
     async def chat_call():
         return await backend.chat(prompt, model, session)
 
-    response = asyncio.run(chat_call())  # Avoid deprecation
+    response = run_async(chat_call())  # Avoid deprecation
 
     session.add_to_history("user", prompt)
     session.add_to_history("assistant", response)
@@ -223,17 +607,31 @@ def chat(prompt: str, model: str = "provider-3/gpt-4o-mini", tts: bool = False,
         text_to_speech(response)
 
 @app.command()
-def generate(code_prompt: str, file: Optional[Path] = None, model: str = "deepseek-coder-v2-lite", project: Path = Path(".")):
+def ask_many(prompts: List[str], model: str = "provider-3/gpt-4o-mini"):
+    """Answers several prompts, coalescing them into packed requests."""
+    async def many_call():
+        # Concurrent chat_queued calls land inside one batching window and
+        # ride a single packed completion request (up to BATCH_MAX_PROMPTS)
+        return await asyncio.gather(*(backend.chat_queued(p, model) for p in prompts))
+
+    responses = run_async(many_call())
+    for prompt, response in zip(prompts, responses):
+        rprint(f"[bold]{prompt}[/bold]")
+        rprint(f"[blue]{response}[/blue]")
+
+@app.command()
+def generate(code_prompt: str, file: Optional[Path] = None, model: str = "deepseek-coder-v2-lite", project: Path = Path("."), batch: bool = False):
     global session
     session = Session(project)
 
     async def gen_call():
-        return await backend.chat(
-            f"Generate clean, executable code for: {code_prompt}. Output *only* the code.",
-            model, session
-        )
+        prompt_text = f"Generate clean, executable code for: {code_prompt}. Output *only* the code."
+        if batch:
+            # Non-interactive path: ~50% cheaper, separate rate-limit pool
+            return await backend.chat_batch_api(prompt_text, model, custom_id=str(file or "generate"))
+        return await backend.chat(prompt_text, model, session)
 
-    response = asyncio.run(gen_call())
+    response = run_async(gen_call())
 
     session.add_to_history("user", code_prompt)
     session.add_to_history("assistant", response)
@@ -247,7 +645,7 @@ def generate(code_prompt: str, file: Optional[Path] = None, model: str = "deepse
         rprint(f"[cyan]{response}[/cyan]")
 
 @app.command()
-def edit(file: Path, instruction: str, model: str = "claude-3.5-sonnet-20241022", auto_commit: bool = False, project: Path = Path(".")):
+def edit(file: Path, instruction: str, model: str = "claude-3.5-sonnet-20241022", auto_commit: bool = False, project: Path = Path("."), batch: bool = False):
     global session
     session = Session(project)
 
@@ -255,16 +653,33 @@ def edit(file: Path, instruction: str, model: str = "claude-3.5-sonnet-20241022"
         current_code = f.read()
 
     async def edit_call():
-        return await backend.chat(
-            f"Edit this code:\n```\n{current_code}\n```\nInstructions: {instruction}\nOutput *only* the full updated code.",
-            model, session
-        )
+        prompt_text = f"Edit this code:\n```\n{current_code}\n```\nInstructions: {instruction}\nOutput *only* the full updated code."
+        if batch:
+            # Non-interactive path: ~50% cheaper, separate rate-limit pool
+            return await backend.chat_batch_api(prompt_text, model, custom_id=str(file))
+        return await backend.chat(prompt_text, model, session)
 
-    response = asyncio.run(edit_call())
+    response = run_async(edit_call())
 
     import difflib
-    diff = list(difflib.unified_diff(current_code.splitlines(), response.splitlines(), lineterm=''))
-    diff_str = "\n".join(diff[:15])
+    # Split both sides once and diff via SequenceMatcher opcodes; stop as
+    # soon as we have the 15 preview lines instead of materializing the
+    # full diff. autojunk=False: in code, "popular" lines (blanks, braces)
+    # are real anchors and the junk heuristic produces degenerate diffs.
+    current_lines = current_code.splitlines()
+    response_lines = response.splitlines()
+    matcher = difflib.SequenceMatcher(None, current_lines, response_lines, autojunk=False)
+    diff_lines = []
+    for tag, i1, i2, j1, j2 in matcher.get_opcodes():
+        if tag == "equal":
+            continue
+        if tag in ("replace", "delete"):
+            diff_lines.extend(f"-{line}" for line in current_lines[i1:i2])
+        if tag in ("replace", "insert"):
+            diff_lines.extend(f"+{line}" for line in response_lines[j1:j2])
+        if len(diff_lines) >= 15:
+            break
+    diff_str = "\n".join(diff_lines[:15])
     rprint(f"[yellow]Diff:\n{diff_str}[/yellow]")
 
     if Confirm.ask("Apply?"):
@@ -275,8 +690,10 @@ def edit(file: Path, instruction: str, model: str = "claude-3.5-sonnet-20241022"
 
 def commit_code(file: Path, msg: str):
     if session and session.git_repo:
-        session.git_repo.git.add(str(file))
-        session.git_repo.git.commit(m=msg)
+        # Index porcelain stays in-process; repo.git.* forks a git binary per call
+        index = session.git_repo.index
+        index.add([str(file)])
+        index.commit(msg)
         rprint(f"[yellow]Committed: {msg}[/yellow]")
 
 @app.command()
@@ -1,100 +1,336 @@
+import io
 import os
 import sys
 import time
 import json
-import requests
-from io import BytesIO
-from PIL import Image
-from openai import OpenAI
-from deep_translator import GoogleTranslator
+import math
+import array
+import base64
+import random
+import asyncio
+import hashlib
+import sqlite3
+import tempfile
+from pathlib import Path
+import httpx
+from openai import AsyncOpenAI
+
+# PIL and deep_translator are imported lazily inside the functions that need
+# them: on Termux/ARM their import cost is a measurable slice of startup, and
+# ASCII prompts never touch the translator at all.
 
 # --- CONFIGURATION & VALIDATION ---
-if len(sys.argv) < 2:
+args = sys.argv[1:]
+
+# Optional --n K: ask Imagen 4 for K variations in ONE request. Providers
+# charge and schedule per-request, so 4 images in one call costs one RTT
+# (and one refine/scaffold pass) instead of four.
+n_images = 1
+if "--n" in args:
+    i = args.index("--n")
+    try:
+        n_images = max(1, int(args[i + 1]))
+    except (IndexError, ValueError):
+        print("❌ Error: --n requires an integer count.")
+        sys.exit(1)
+    del args[i:i + 2]
+
+if not args:
     print("❌ Error: No prompt provided.")
-    print("Usage: python generate_image.py \"Your desired image prompt here\"")
+    print("Usage: python generate_image.py \"Your desired image prompt here\" [--n K]")
     sys.exit(1)
 
-prompt = sys.argv[1]
+prompt = args[0]
 timestamp = int(time.time())
 
+# Fast path: skip the Phoenix + vision scaffold and call Imagen 4 directly
+# with the refined/translated prompt (1 model round-trip instead of 3).
+# The multi-stage blend stays the default for quality.
+FAST_MODE = os.environ.get("STEVEAI_FAST") == "1"
+
 # Define the standard save directory for Termux
 save_dir = os.path.expanduser("~/storage/pictures")
-os.makedirs(save_dir, exist_ok=True) 
+os.makedirs(save_dir, exist_ok=True)
 
 save_path_final = os.path.join(save_dir, f"blended_image_final_{timestamp}.png")
-save_path_intermediate = os.path.join(save_dir, f"phoenix_base_image_{timestamp}.png")
+
+# The Phoenix intermediate only feeds the vision model (by URL) and is never
+# shown to the user, so it lands in the temp dir as a compact JPEG instead of
+# cluttering the pictures folder with raw 1024x1024 PNGs. Set
+# STEVEAI_KEEP_INTERMEDIATE=1 to keep it alongside the final image.
+if os.environ.get("STEVEAI_KEEP_INTERMEDIATE"):
+    save_path_intermediate = os.path.join(save_dir, f"phoenix_base_image_{timestamp}.jpg")
+else:
+    save_path_intermediate = os.path.join(tempfile.gettempdir(), f"phoenix_base_image_{timestamp}.jpg")
 
 # --- OPENAI CLIENT SETUP ---
-A4F_API_KEY = "ddc-a4f-d61cbe09b0f945ea93403a420dba8155" 
+# The key lives in the environment, not in source (export A4F_API_KEY=...).
+A4F_API_KEY = os.environ.get("A4F_API_KEY")
+if not A4F_API_KEY:
+    print("❌ Error: A4F_API_KEY environment variable is not set.")
+    print("Get a key from https://api.a4f.co and run: export A4F_API_KEY=\"your-key\"")
+    sys.exit(1)
 A4F_BASE_URL = "https://api.a4f.co/v1"
-client = OpenAI(api_key=A4F_API_KEY, base_url=A4F_BASE_URL)
+
+# All four model calls target api.a4f.co: an HTTP/2 transport multiplexes
+# them over a single TLS session instead of burning a handshake per call.
+api_http = httpx.AsyncClient(
+    http2=True,
+    limits=httpx.Limits(max_keepalive_connections=8, max_connections=16),
+    timeout=httpx.Timeout(60.0, connect=5.0),
+)
+client = AsyncOpenAI(api_key=A4F_API_KEY, base_url=A4F_BASE_URL, http_client=api_http)
+
+# One pooled async client for all image downloads: the second download rides
+# the TLS session established by the first, and connect failures are retried
+# at the transport level.
+http = httpx.AsyncClient(
+    timeout=httpx.Timeout(30, connect=3.05),
+    limits=httpx.Limits(max_keepalive_connections=4, max_connections=8),
+    transport=httpx.AsyncHTTPTransport(retries=3),
+)
 
 # --- MODEL IDs ---
 # FIX: Use the correct Imagen 4 ID
 IMAGEN_MODEL_ID = "provider-4/imagen-4"
 PHOENIX_MODEL_ID = "provider-4/phoenix"
 # FIX: Use the correct GPT-4o Mini ID for vision support
-VISION_MODEL_ID = "provider-5/gpt-4o-mini-2024-07-18" 
+VISION_MODEL_ID = "provider-5/gpt-4o-mini-2024-07-18"
 REFINER_MODEL_ID = "provider-5/gpt-4o-mini" # Retained original for refinement since it works for text
+EMBED_MODEL_ID = "provider-3/text-embedding-ada-002" # Cheap embeddings for the semantic cache
+
+
+# --- STATIC PROMPTS ---
+# Hoisted to module constants and kept byte-identical run to run: providers
+# only serve their prompt cache on exact prefix matches, so no timestamps or
+# interpolation may leak into these strings.
+REFINER_SYSTEM_INSTRUCTION = (
+    "You are an expert AI image generation prompt engineer. Your response MUST be a JSON object "
+    "with exactly two keys: 'primary_prompt' (the highly detailed prompt) and 'negative_prompt' (a comma-separated string of negative keywords). "
+    "Generate a primary prompt that includes: 1. Subject/Scene details. 2. Lighting/Mood. 3. Artistic Style/Medium. 4. Camera/Aesthetic terms. "
+    "Example Response: {'primary_prompt': 'A detailed scene...', 'negative_prompt': 'blurry, noise, watermark'}"
+)
+
+VISION_INSTRUCTION = (
+    "Based on the following image, generate a highly detailed, descriptive text prompt (max 200 words) "
+    "that accurately captures its composition, lighting, and mood. The goal is to recreate this exact "
+    "scene but with a photorealistic, cinematic style."
+)
+
+# Stable cache key sent with refiner calls (honored by providers that support it)
+PROMPT_CACHE_KEY = "steveai-refiner-v1"
 
 
 # --- HELPER FUNCTIONS ---
 
-def refine_prompt(current_prompt):
+def _as_image_ref(url_or_path):
+    """Builds a chat-API image part, preferring the URL form.
+
+    Passing the provider URL lets the model fetch the image CDN-side; the
+    base64 data-URI fallback re-uploads the whole file in the request body
+    (~1.3x the image size on the wire), so it is only used for local paths.
+    """
+    u = str(url_or_path)
+    if u.startswith("https://") or u.startswith("http://"):
+        return {"type": "image_url", "image_url": {"url": u}}
+    with open(u, "rb") as f:
+        encoded = base64.b64encode(f.read()).decode()
+    return {"type": "image_url", "image_url": {"url": f"data:image/jpeg;base64,{encoded}"}}
+
+
+async def with_retries(label, call, attempts=4):
+    """Retries transient API failures with jittered exponential backoff.
+
+    A single 503 from the proxy used to kill the whole pipeline and force a
+    full re-run of every stage. Only transient errors (429, 5xx, timeouts /
+    connection drops) are retried; a 400 fails the same way every time, so
+    it is raised immediately.
+    """
+    for attempt in range(attempts):
+        try:
+            return await call()
+        except Exception as e:
+            status = getattr(e, "status_code", None)
+            if status is None:
+                status = getattr(getattr(e, "response", None), "status_code", None)
+            transient = status is None or status == 429 or status >= 500
+            if not transient or attempt == attempts - 1:
+                raise
+            delay = min(0.5 * (2 ** attempt), 8) + random.random() * 0.5
+            print(f"⚠️ {label} failed ({e}). Retrying in {delay:.1f}s...")
+            await asyncio.sleep(delay)
+
+
+# Exact-match cache for refined prompts: re-running the same prompt skips the
+# refiner LLM round-trip entirely (the largest fixed cost before any image call).
+REFINE_CACHE_PATH = Path("~/.cache/steveai/refine.sqlite").expanduser()
+
+# Semantic near-match settings: "a red car at night" and "red car at
+# nighttime" embed within a whisker of each other, so a prior refinement can
+# be reused without another LLM round-trip. One embedding call (~tens of ms)
+# buys the lookup; an LLM refine costs seconds.
+SEMANTIC_THRESHOLD = 0.92
+SEMANTIC_CACHE_MAX = 512
+
+def open_refine_cache():
+    REFINE_CACHE_PATH.parent.mkdir(parents=True, exist_ok=True)
+    conn = sqlite3.connect(REFINE_CACHE_PATH)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute(
+        "CREATE TABLE IF NOT EXISTS refine("
+        "key TEXT PRIMARY KEY, primary_prompt TEXT, negative_prompt TEXT, ts INTEGER)"
+    )
+    conn.execute(
+        "CREATE TABLE IF NOT EXISTS refine_sem("
+        "id INTEGER PRIMARY KEY AUTOINCREMENT, embedding BLOB, "
+        "primary_prompt TEXT, negative_prompt TEXT, ts INTEGER)"
+    )
+    return conn
+
+
+async def _embed_prompt(text):
+    """Fetches an embedding for semantic cache matching; None on failure."""
+    try:
+        resp = await client.embeddings.create(model=EMBED_MODEL_ID, input=text)
+        return resp.data[0].embedding
+    except Exception as e:
+        print(f"Warning: embedding unavailable ({e}). Semantic cache skipped.")
+        return None
+
+
+def _cosine(a, b):
+    dot = na = nb = 0.0
+    for x, y in zip(a, b):
+        dot += x * y
+        na += x * x
+        nb += y * y
+    if na == 0.0 or nb == 0.0:
+        return 0.0
+    return dot / math.sqrt(na * nb)
+
+
+def _semantic_lookup(cache, emb):
+    """Scans stored embeddings for the closest prior prompt."""
+    best_sim, best_row = 0.0, None
+    rows = cache.execute(
+        "SELECT embedding, primary_prompt, negative_prompt FROM refine_sem"
+    )
+    for blob, primary, negative in rows:
+        vec = array.array("f")
+        vec.frombytes(blob)
+        sim = _cosine(emb, vec)
+        if sim > best_sim:
+            best_sim, best_row = sim, (primary, negative)
+    return best_sim, best_row
+
+
+async def refine_prompt(current_prompt):
     """
     Refines the prompt. FIX: Switched to plain text response parsing due to JSON error.
     """
     print(f"\n--- 🧠 Prompt Refinement ---")
     print(f"Original Prompt: '{current_prompt}'")
-    
-    system_instruction = (
-        "You are an expert AI image generation prompt engineer. Your response MUST be a JSON object "
-        "with exactly two keys: 'primary_prompt' (the highly detailed prompt) and 'negative_prompt' (a comma-separated string of negative keywords). "
-        "Generate a primary prompt that includes: 1. Subject/Scene details. 2. Lighting/Mood. 3. Artistic Style/Medium. 4. Camera/Aesthetic terms. "
-        "Example Response: {'primary_prompt': 'A detailed scene...', 'negative_prompt': 'blurry, noise, watermark'}"
-    )
-    
+
+    # Exact-match cache lookup: key covers everything that shapes the output
+    cache_key = hashlib.sha256(
+        f"{REFINER_SYSTEM_INSTRUCTION}|{current_prompt}|{REFINER_MODEL_ID}|0.8".encode()
+    ).hexdigest()
+    try:
+        cache = open_refine_cache()
+    except sqlite3.Error as e:
+        print(f"Warning: refine cache unavailable ({e}).")
+        cache = None
+
+    if cache is not None:
+        row = cache.execute(
+            "SELECT primary_prompt, negative_prompt FROM refine WHERE key = ?", (cache_key,)
+        ).fetchone()
+        if row:
+            print("\n✅ Refined Prompt (cached):", row[0])
+            print("🚫 Negative Prompt (cached):", row[1])
+            cache.close()
+            return {"prompt": row[0], "negative_prompt": row[1]}
+
+    # Near-duplicate prompts reuse a prior refinement via embedding similarity
+    emb = await _embed_prompt(current_prompt) if cache is not None else None
+    if emb is not None:
+        best_sim, best_row = _semantic_lookup(cache, emb)
+        if best_row is not None and best_sim >= SEMANTIC_THRESHOLD:
+            print(f"\n✅ Refined Prompt (semantic cache, sim={best_sim:.2f}):", best_row[0])
+            print("🚫 Negative Prompt (semantic cache):", best_row[1])
+            cache.close()
+            return {"prompt": best_row[0], "negative_prompt": best_row[1]}
+
     # We will still ask for JSON but parse it as a string to handle API quirks
     try:
-        completion = client.chat.completions.create(
+        completion = await with_retries("Prompt refinement", lambda: client.chat.completions.create(
             model=REFINER_MODEL_ID,
             # Removed response_format={"type": "json_object"} to fix "Expecting value" error
             messages=[
-                {"role": "system", "content": system_instruction},
+                {"role": "system", "content": REFINER_SYSTEM_INSTRUCTION},
                 {"role": "user", "content": f"Refine this into a perfect image prompt: {current_prompt}"},
             ],
             temperature=0.8,
-        )
-        
+            extra_headers={"prompt-cache-key": PROMPT_CACHE_KEY},
+        ))
+
         # Manually parse the text content, assuming it adheres to the requested JSON format
         json_string = completion.choices[0].message.content.strip()
         refined_json = json.loads(json_string)
-        
+
         refined_prompt = refined_json.get("primary_prompt", current_prompt)
         # Note: The system instruction was changed to ask for a comma-separated STRING for negative_prompt
         negative_prompt_string = refined_json.get("negative_prompt", "")
-        
+
         if not negative_prompt_string:
              negative_prompt_string = "blurry, worst quality, noise, disfigured, watermark, ugly"
-        
+
         print("\n✅ Refined Prompt:", refined_prompt)
         print("🚫 Negative Prompt:", negative_prompt_string)
-        
+
+        if cache is not None:
+            cache.execute(
+                "INSERT OR REPLACE INTO refine VALUES (?, ?, ?, ?)",
+                (cache_key, refined_prompt, negative_prompt_string, int(time.time()))
+            )
+            if emb is not None:
+                cache.execute(
+                    "INSERT INTO refine_sem(embedding, primary_prompt, negative_prompt, ts) "
+                    "VALUES (?, ?, ?, ?)",
+                    (array.array("f", emb).tobytes(), refined_prompt,
+                     negative_prompt_string, int(time.time()))
+                )
+                # Keep the scan bounded: evict the oldest rows past the cap
+                cache.execute(
+                    "DELETE FROM refine_sem WHERE id NOT IN "
+                    "(SELECT id FROM refine_sem ORDER BY ts DESC LIMIT ?)",
+                    (SEMANTIC_CACHE_MAX,)
+                )
+            cache.commit()
+            cache.close()
+
         return {
             "prompt": refined_prompt,
             "negative_prompt": negative_prompt_string
         }
-        
+
     except Exception as error:
         print(f"❌ Error getting chat completion: {error}. Falling back to original prompt.")
+        if cache is not None:
+            cache.close()
         return {
             "prompt": current_prompt,
             "negative_prompt": "blurry, worst quality, noise, disfigured, watermark, ugly"
         }
 
-# (translate_prompt function remains unchanged)
 def translate_prompt(p):
     """Translates the prompt to English using Google Translator."""
+    # Cheap structural pre-check: pure-ASCII text is already English for our
+    # purposes, so skip the translation round-trip (the common case).
+    if p.isascii():
+        print("Prompt is ASCII/English. Skipping translation.")
+        return p
+    from deep_translator import GoogleTranslator
     try:
         translated = GoogleTranslator(source="auto", target="en").translate(p)
         if translated.strip().lower() == p.strip().lower():
@@ -108,122 +344,166 @@ def translate_prompt(p):
         return p
 
 
-# --- MAIN EXECUTION ---
-refined_output = refine_prompt(prompt)
-refined_prompt_text = refined_output["prompt"]
-negative_prompt_text = refined_output["negative_prompt"]
-PromptEN = translate_prompt(refined_prompt_text)
+async def download_image(url, save_path, label, jpeg_quality=None):
+    """Streams an image URL to disk in 64 KB chunks via the shared client.
 
-image_url_phoenix = None
-phoenix_description = refined_prompt_text # Fallback description
+    Chunked writes keep the memory footprint at one buffer instead of the
+    whole multi-MB PNG; the running sha256 lets us verify/identify the file.
+    With jpeg_quality set, the image is re-encoded as a JPEG at that quality
+    instead — roughly 10x fewer bytes written for scaffold images.
+    """
+    digest = hashlib.sha256()
+    async with http.stream("GET", url) as img_response:
+        img_response.raise_for_status()
+        if jpeg_quality:
+            from PIL import Image
+            buf = bytearray()
+            async for chunk in img_response.aiter_bytes(65536):
+                buf += chunk
+                digest.update(chunk)
+            with Image.open(io.BytesIO(buf)) as img:
+                img.convert("RGB").save(save_path, "JPEG", quality=jpeg_quality, optimize=True)
+        else:
+            with open(save_path, 'wb') as handler:
+                async for chunk in img_response.aiter_bytes(65536):
+                    handler.write(chunk)
+                    digest.update(chunk)
+    print(f"{label} image saved to {save_path} (sha256 {digest.hexdigest()[:16]}...)")
+    return save_path
 
-# --- STEP 1: Generate with Phoenix for Base Composition ---
-try:
-    print("\n--- 1️⃣ Phoenix Base Composition ---")
-    
-    # Negative prompt applied using the system-style string format
-    phoenix_prompt_final = f"negative things NOT to generate: {negative_prompt_text}. {PromptEN}"
 
-    response_phoenix = client.images.generate(
-        prompt=phoenix_prompt_final,
-        model=PHOENIX_MODEL_ID, 
-        n=1,
-        size="1024x1024",
-    )
+# --- MAIN PIPELINE ---
 
-    if response_phoenix.data and response_phoenix.data[0].url:
-        image_url_phoenix = response_phoenix.data[0].url
-        print(f"Phoenix Image URL: {image_url_phoenix}")
+async def main():
+    refined_output = await refine_prompt(prompt)
+    refined_prompt_text = refined_output["prompt"]
+    negative_prompt_text = refined_output["negative_prompt"]
+    PromptEN = translate_prompt(refined_prompt_text)
 
-        # Download and save the intermediate image
-        img_response = requests.get(image_url_phoenix)
-        img_response.raise_for_status()
-        
-        with open(save_path_intermediate, 'wb') as handler:
-            handler.write(img_response.content)
-        print(f"Intermediate Phoenix image saved to {save_path_intermediate}")
+    image_url_phoenix = None
+    phoenix_description = refined_prompt_text # Fallback description
+
+    if FAST_MODE:
+        print("\n--- ⚡ Fast mode: Imagen 4 direct (Phoenix/vision skipped) ---")
+        phoenix_description = PromptEN
     else:
-        print("❌ Phoenix image generation failed. Cannot proceed.")
-        sys.exit(1)
+        # --- STEP 1: Generate with Phoenix for Base Composition ---
+        try:
+            print("\n--- 1️⃣ Phoenix Base Composition ---")
 
-except Exception as e:
-    print(f"❌ An error occurred during Phoenix generation: {e}")
-    sys.exit(1)
+            # Negative prompt applied using the system-style string format
+            phoenix_prompt_final = f"negative things NOT to generate: {negative_prompt_text}. {PromptEN}"
 
+            response_phoenix = await with_retries("Phoenix generation", lambda: client.images.generate(
+                prompt=phoenix_prompt_final,
+                model=PHOENIX_MODEL_ID,
+                n=1,
+                size="1024x1024",
+            ))
 
-# --- STEP 2: Describe Phoenix Output using Vision Model ---
-try:
-    print("\n--- 2️⃣ Vision Model Analysis (Describing Phoenix Output) ---")
-    
-    # FIX: Use the correct VISION_MODEL_ID
-    vision_response = client.chat.completions.create(
-      model=VISION_MODEL_ID,
-      messages=[
-        {
-          "role": "user",
-          "content": [
-            {
-              "type": "text",
-              "text": f"Based on the following image, generate a highly detailed, descriptive text prompt (max 200 words) that accurately captures its composition, lighting, and mood. The goal is to recreate this exact scene but with a photorealistic, cinematic style."
-            },
-            {
-              "type": "image_url",
-              "image_url": {
-                "url": image_url_phoenix
-              }
-            }
-          ]
-        }
-      ]
-    )
-    
-    phoenix_description = vision_response.choices[0].message.content
-    print("✨ Vision Model Description:", phoenix_description)
-
-except Exception as e:
-    print(f"❌ Error using Vision Model to describe image: {e}. Using refined text prompt as fallback.")
-    # Fallback remains: phoenix_description = refined_prompt_text
-
-
-# --- STEP 3: Refine with Imagen 4 (Text Blending) ---
-try:
-    print("\n--- 3️⃣ Imagen 4 Style Refinement (The Blend) ---")
-    
-    # Blend the Phoenix description (composition) with the Imagen 4 style guide
-    final_prompt_base = f"Transform this scene: '{phoenix_description}' into an ultra-photorealistic image with the signature detail and volumetric lighting of Imagen 4. Maintain the exact composition, focus on clarity and cinematic depth."
-
-    # Negative prompt applied using the system-style string format
-    imagen4_prompt_final = f"negative things NOT to generate: {negative_prompt_text}. {final_prompt_base}"
-    
-    response_imagen4 = client.images.generate(
-        prompt=imagen4_prompt_final, 
-        # FIX: Use the correct IMAGEN_MODEL_ID
-        model=IMAGEN_MODEL_ID, 
-        n=1,
-        size="1024x1024",
-    )
+            if response_phoenix.data and response_phoenix.data[0].url:
+                image_url_phoenix = response_phoenix.data[0].url
+                print(f"Phoenix Image URL: {image_url_phoenix}")
+            else:
+                print("❌ Phoenix image generation failed. Cannot proceed.")
+                sys.exit(1)
 
-    if response_imagen4.data and response_imagen4.data[0].url:
-        image_url_final = response_imagen4.data[0].url
-        print(f"Final (Blended) Image URL: {image_url_final}")
+        except Exception as e:
+            print(f"❌ An error occurred during Phoenix generation: {e}")
+            sys.exit(1)
 
-        # --- DOWNLOAD AND SAVE FINAL IMAGE ---
-        print(f"Downloading final image from URL...")
-        final_img_response = requests.get(image_url_final)
-        final_img_response.raise_for_status()
+        # Kick off the intermediate download in the background: the vision model
+        # only needs the URL, so the two network operations overlap.
+        intermediate_task = asyncio.create_task(
+            download_image(image_url_phoenix, save_path_intermediate, "Intermediate Phoenix", jpeg_quality=85)
+        )
 
-        # Save the final image locally
-        with open(save_path_final, 'wb') as handler:
-            handler.write(final_img_response.content)
+        # --- STEP 2: Describe Phoenix Output using Vision Model ---
+        try:
+            print("\n--- 2️⃣ Vision Model Analysis (Describing Phoenix Output) ---")
 
-        print(f"\n✨ **SUCCESS!** Blended image saved to {save_path_final}")
-        
-        # Confirm download properties
-        img = Image.open(BytesIO(final_img_response.content))
-        print(f"File properties: {img.width}x{img.height}, format: {img.format}")
+            # FIX: Use the correct VISION_MODEL_ID
+            vision_response = await with_retries("Vision description", lambda: client.chat.completions.create(
+              model=VISION_MODEL_ID,
+              messages=[
+                {
+                  "role": "user",
+                  "content": [
+                    {
+                      "type": "text",
+                      "text": VISION_INSTRUCTION
+                    },
+                    _as_image_ref(image_url_phoenix)
+                  ]
+                }
+              ]
+            ))
 
-    else:
-        print("❌ Imagen 4 refinement failed. No final image data received.")
-        
-except Exception as e:
-    print(f"❌ An error occurred during Imagen 4 generation: {e}")
+            phoenix_description = vision_response.choices[0].message.content
+            print("✨ Vision Model Description:", phoenix_description)
+
+        except Exception as e:
+            print(f"❌ Error using Vision Model to describe image: {e}. Using refined text prompt as fallback.")
+            # Fallback remains: phoenix_description = refined_prompt_text
+
+        # Make sure the intermediate image actually landed on disk
+        try:
+            await intermediate_task
+        except Exception as e:
+            print(f"❌ Error downloading intermediate Phoenix image: {e}")
+
+    # --- STEP 3: Refine with Imagen 4 (Text Blending) ---
+    try:
+        print("\n--- 3️⃣ Imagen 4 Style Refinement (The Blend) ---")
+
+        # Blend the Phoenix description (composition) with the Imagen 4 style guide
+        final_prompt_base = f"Transform this scene: '{phoenix_description}' into an ultra-photorealistic image with the signature detail and volumetric lighting of Imagen 4. Maintain the exact composition, focus on clarity and cinematic depth."
+
+        # Negative prompt applied using the system-style string format
+        imagen4_prompt_final = f"negative things NOT to generate: {negative_prompt_text}. {final_prompt_base}"
+
+        response_imagen4 = await with_retries("Imagen 4 refinement", lambda: client.images.generate(
+            prompt=imagen4_prompt_final,
+            # FIX: Use the correct IMAGEN_MODEL_ID
+            model=IMAGEN_MODEL_ID,
+            n=n_images,
+            size="1024x1024",
+        ))
+
+        final_urls = [d.url for d in (response_imagen4.data or []) if d.url]
+        if final_urls:
+            # --- DOWNLOAD AND SAVE FINAL IMAGE(S) ---
+            print(f"Downloading {len(final_urls)} final image(s) concurrently...")
+            save_paths = []
+            for i, url in enumerate(final_urls):
+                print(f"Final (Blended) Image URL: {url}")
+                # Keep the unsuffixed filename for the single-image case
+                path = save_path_final if len(final_urls) == 1 else os.path.join(
+                    save_dir, f"blended_image_final_{timestamp}_{i}.png"
+                )
+                save_paths.append(path)
+            await asyncio.gather(*(
+                download_image(url, path, "Final blended")
+                for url, path in zip(final_urls, save_paths)
+            ))
+
+            for path in save_paths:
+                print(f"\n✨ **SUCCESS!** Blended image saved to {path}")
+
+                # Confirm download properties from the saved file
+                from PIL import Image
+                with Image.open(path) as img:
+                    print(f"File properties: {img.width}x{img.height}, format: {img.format}")
+
+        else:
+            print("❌ Imagen 4 refinement failed. No final image data received.")
+
+    except Exception as e:
+        print(f"❌ An error occurred during Imagen 4 generation: {e}")
+
+    await http.aclose()
+    await api_http.aclose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -1,11 +1,22 @@
 import os
+import json
+import time
 import asyncio
+import collections
 import io
 import traceback
 import pyaudio
 
+# libuv event loop: lower per-tick overhead for the audio queues, serial
+# bridge callbacks and WebSocket traffic. Falls back to the stdlib loop.
+try:
+    import uvloop
+    asyncio.set_event_loop_policy(uvloop.EventLoopPolicy())
+except ImportError:
+    pass
+
 # --- NEW: Import the RoverBridge from bridge.py ---
-from bridge import RoverBridge
+from bridge import RoverBridge, ALERT_RE
 
 from google import genai
 from google.genai import types
@@ -19,6 +30,9 @@ CHANNELS = 1
 SEND_SAMPLE_RATE = 16000
 RECEIVE_SAMPLE_RATE = 24000
 CHUNK_SIZE = 1024
+# Precomputed once at import: this string is constant for the whole process,
+# so per-chunk sends don't re-format it.
+SEND_MIME_TYPE = f"audio/pcm;rate={SEND_SAMPLE_RATE}"
 
 MODEL = "models/gemini-2.5-flash-native-audio-preview-09-2025"
 DEFAULT_MODE = "none"
@@ -53,6 +67,35 @@ ROVER_TOOL = types.Tool(
 
 # --- Configuration for Live Connect Session ---
 
+# Session-resumption handle persisted across restarts: reconnecting with a
+# recent handle restores the server-side session (system instruction, tool
+# schema and conversation state) instead of re-paying the whole prefix on
+# every connect. The Live API has no cached_content hook, so this is its
+# native equivalent of explicit context caching.
+RESUME_STATE_PATH = os.path.expanduser("~/.cache/steveai/live_session.json")
+RESUME_TTL_S = 600  # Handles go stale server-side; don't offer old ones
+
+
+def _load_resume_handle():
+    try:
+        with open(RESUME_STATE_PATH) as f:
+            state = json.load(f)
+        if time.time() - state["ts"] < RESUME_TTL_S:
+            return state["handle"]
+    except (OSError, ValueError, KeyError):
+        pass
+    return None
+
+
+def _store_resume_handle(handle):
+    try:
+        os.makedirs(os.path.dirname(RESUME_STATE_PATH), exist_ok=True)
+        with open(RESUME_STATE_PATH, "w") as f:
+            json.dump({"handle": handle, "ts": time.time()}, f)
+    except OSError:
+        pass
+
+
 VAD_CONFIG = types.RealtimeInputConfig(
     automatic_activity_detection=AutomaticActivityDetection(
         end_of_speech_sensitivity=EndSensitivity.END_SENSITIVITY_LOW
@@ -78,6 +121,9 @@ CONFIG = types.LiveConnectConfig(
         sliding_window=types.SlidingWindow(target_tokens=32000),
     ),
     tools=[ROVER_TOOL], # Use the tool defined above
+
+    # Resume the previous session when a fresh handle is on disk
+    session_resumption=types.SessionResumptionConfig(handle=_load_resume_handle()),
 )
 
 pya = pyaudio.PyAudio()
@@ -86,10 +132,17 @@ pya = pyaudio.PyAudio()
 class AudioLoop:
     def __init__(self, bridge: RoverBridge):
         self.bridge = bridge # The external RoverBridge instance
-        self.audio_in_queue = None
         self.out_queue = None
         self.session = None
         self.audio_stream = None
+        self.playback_stream = None
+        self.loop = None  # Set in run(); used by the PortAudio callback
+        # Playback ring buffer: receive_audio appends, the output callback
+        # pops. Individual deque ops are GIL-atomic, but clear() on
+        # turn_complete can race the callback's check-then-pop, so the pop
+        # itself is guarded in _spk_cb.
+        self._spk_buf = collections.deque()
+        self._spk_pending = bytearray()
 
     async def send_text(self):
         while True:
@@ -103,15 +156,45 @@ class AudioLoop:
 
     async def send_realtime(self):
         while True:
-            msg = await self.out_queue.get()
+            buf = await self.out_queue.get()
+            # Coalesce whatever else is queued (up to ~200 ms) into one Blob:
+            # fewer WebSocket frames, and a backlog collapses into one send
+            # instead of amplifying into one call per chunk.
+            while not self.out_queue.empty() and len(buf) < 6400:
+                buf += self.out_queue.get_nowait()
+                self.out_queue.task_done()
             audio_blob = Blob(
-                data=msg["data"],
-                mime_type=f"audio/pcm;rate={SEND_SAMPLE_RATE}"
+                data=buf,
+                mime_type=SEND_MIME_TYPE
             )
             await self.session.send_realtime_input(audio=audio_blob)
             self.out_queue.task_done()
 
-    async def listen_audio(self):
+    def _mic_cb(self, in_data, frame_count, time_info, status):
+        """PortAudio callback: runs on the audio thread, never blocks.
+
+        Frames go straight from PortAudio into the asyncio queue via
+        call_soon_threadsafe — no thread-pool dispatch per chunk.
+        """
+        self.loop.call_soon_threadsafe(self._enqueue_mic, in_data)
+        return (None, pyaudio.paContinue)
+
+    def _enqueue_mic(self, data):
+        # Raw bytes go straight onto the queue: PortAudio already handed us
+        # an immutable buffer, so boxing it in a dict per frame only feeds
+        # the allocator.
+        try:
+            self.out_queue.put_nowait(data)
+        except asyncio.QueueFull:
+            # Sender is behind—drop the oldest frame (stale audio) and keep
+            # the newest so end-to-end latency stays bounded.
+            try:
+                self.out_queue.get_nowait()
+            except asyncio.QueueEmpty:
+                pass
+            self.out_queue.put_nowait(data)
+
+    async def start_listening(self):
         try:
             mic_info = pya.get_default_input_device_info()
             mic_index = mic_info.get("index")
@@ -127,15 +210,11 @@ class AudioLoop:
             input=True,
             input_device_index=mic_index,
             frames_per_buffer=CHUNK_SIZE,
+            stream_callback=self._mic_cb,
         )
-        kwargs = {"exception_on_overflow": False}
 
         print("\n--- Listening to Microphone. Say a command! ---")
 
-        while True:
-            data = await asyncio.to_thread(self.audio_stream.read, CHUNK_SIZE, **kwargs)
-            await self.out_queue.put({"data": data})
-
     async def handle_tool_call(self, tool_call):
         """Processes a tool call from the model (e.g., 'send_rover_command')."""
         if tool_call.function_call.name == "send_rover_command":
@@ -172,7 +251,11 @@ class AudioLoop:
         while True:
             # Wait for feedback to appear in the queue
             feedback = await self.bridge.get_feedback()
-            print(f"\n<- ROVER FEEDBACK: {feedback}")
+            # Single compiled-regex pass over the message for alert keywords
+            if feedback and (m := ALERT_RE.search(feedback)):
+                print(f"\n🚨 ROVER ALERT: {m.group()} in '{feedback}'")
+            else:
+                print(f"\n<- ROVER FEEDBACK: {feedback}")
 
 
     async def receive_audio_and_process(self):
@@ -181,7 +264,7 @@ class AudioLoop:
             turn = self.session.receive()
             async for response in turn:
                 if data := response.data:
-                    self.audio_in_queue.put_nowait(data)
+                    self._spk_buf.append(data)
                     continue
                 if text := response.text:
                     print(f"USER: {text}", end="\r", flush=True)
@@ -190,24 +273,49 @@ class AudioLoop:
                     print(f"\nAI requested tool: {tool_call.function_call.name}")
                     await self.handle_tool_call(tool_call)
                     continue
+                if update := response.session_resumption_update:
+                    if update.resumable and update.new_handle:
+                        _store_resume_handle(update.new_handle)
+                    continue
 
             # Stop playback on turn_complete
-            while not self.audio_in_queue.empty():
-                self.audio_in_queue.get_nowait()
+            self._spk_buf.clear()
+            self._spk_pending = bytearray()
             print("\nAI Response Complete. Ready for next command.")
 
-    async def play_audio(self):
-        stream = await asyncio.to_thread(
+    def _spk_cb(self, in_data, frame_count, time_info, status):
+        """PortAudio output callback: pulls PCM from the ring buffer.
+
+        Underruns are padded with silence so playback never stalls the
+        audio thread or hops through the asyncio thread pool.
+        """
+        needed = frame_count * 2  # 16-bit mono PCM
+        out = self._spk_pending
+        while len(out) < needed and self._spk_buf:
+            try:
+                out += self._spk_buf.popleft()
+            except IndexError:
+                # turn_complete cleared the deque between the check and
+                # the pop; treat the buffer as drained
+                break
+        if len(out) >= needed:
+            chunk = bytes(out[:needed])
+            self._spk_pending = bytearray(out[needed:])
+        else:
+            chunk = bytes(out) + b"\x00" * (needed - len(out))
+            self._spk_pending = bytearray()
+        return (chunk, pyaudio.paContinue)
+
+    async def start_playback(self):
+        self.playback_stream = await asyncio.to_thread(
             pya.open,
             format=FORMAT,
             channels=CHANNELS,
             rate=RECEIVE_SAMPLE_RATE,
             output=True,
+            frames_per_buffer=480,
+            stream_callback=self._spk_cb,
         )
-        while True:
-            bytestream = await self.audio_in_queue.get()
-            await asyncio.to_thread(stream.write, bytestream)
-            self.audio_in_queue.task_done()
 
     async def run(self):
         try:
@@ -216,18 +324,18 @@ class AudioLoop:
                 asyncio.TaskGroup() as tg,
             ):
                 self.session = session
-                self.audio_in_queue = asyncio.Queue()
+                self.loop = asyncio.get_running_loop()
                 self.out_queue = asyncio.Queue(maxsize=5)
 
                 send_text_task = tg.create_task(self.send_text())
                 tg.create_task(self.send_realtime())
-                tg.create_task(self.listen_audio())
+                await self.start_listening()  # Callback stream—no reader task
                 tg.create_task(self.receive_audio_and_process())
-                tg.create_task(self.play_audio())
+                await self.start_playback()   # Callback stream—no writer task
                 
-                # Start the background task to listen for Arduino feedback
+                # The bridge's reader thread already listens for Arduino
+                # feedback; just consume its queue here.
                 if self.bridge.is_connected:
-                    tg.create_task(self.bridge.listen_for_feedback())
                     tg.create_task(self.process_rover_feedback())
 
                 await send_text_task
@@ -242,6 +350,8 @@ class AudioLoop:
         finally:
             if self.audio_stream:
                  await asyncio.to_thread(self.audio_stream.close)
+            if self.playback_stream:
+                 await asyncio.to_thread(self.playback_stream.close)
             if 'pya' in globals():
                 await asyncio.to_thread(pya.terminate)
             print("AI Cleanup complete.")
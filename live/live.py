@@ -1,9 +1,18 @@
 import os
 import asyncio
+import collections
 import io
 import traceback
 import pyaudio
 
+# libuv event loop: lower per-tick overhead for the audio queues and
+# WebSocket traffic. Falls back to the stdlib loop (e.g. on Windows).
+try:
+    import uvloop
+    asyncio.set_event_loop_policy(uvloop.EventLoopPolicy())
+except ImportError:
+    pass
+
 from google import genai
 from google.genai import types
 # --- EXPLICIT IMPORTS FOR CLARITY ---
@@ -17,6 +26,9 @@ CHANNELS = 1
 SEND_SAMPLE_RATE = 16000
 RECEIVE_SAMPLE_RATE = 24000
 CHUNK_SIZE = 1024
+# Precomputed once at import: this string is constant for the whole process,
+# so per-chunk sends don't re-format it.
+SEND_MIME_TYPE = f"audio/pcm;rate={SEND_SAMPLE_RATE}"
 
 MODEL = "models/gemini-2.5-flash-native-audio-preview-09-2025" 
 
@@ -73,10 +85,17 @@ pya = pyaudio.PyAudio()
 class AudioLoop:
     def __init__(self, video_mode=DEFAULT_MODE):
         self.video_mode = video_mode
-        self.audio_in_queue = None
         self.out_queue = None
         self.session = None
         self.audio_stream = None
+        self.playback_stream = None
+        self.loop = None  # Set in run(); used by the PortAudio callback
+        # Playback ring buffer: receive_audio appends, the output callback
+        # pops. Individual deque ops are GIL-atomic, but clear() on
+        # turn_complete can race the callback's check-then-pop, so the pop
+        # itself is guarded in _spk_cb.
+        self._spk_buf = collections.deque()
+        self._spk_pending = bytearray()
 
     async def send_text(self):
         while True:
@@ -90,22 +109,52 @@ class AudioLoop:
 
     async def send_realtime(self):
         while True:
-            msg = await self.out_queue.get()
+            buf = await self.out_queue.get()
+            # Coalesce whatever else is queued (up to ~200 ms) into one Blob:
+            # fewer WebSocket frames, and a backlog collapses into one send
+            # instead of amplifying into one call per chunk.
+            while not self.out_queue.empty() and len(buf) < 6400:
+                buf += self.out_queue.get_nowait()
+                self.out_queue.task_done()
             audio_blob = Blob(
-                data=msg["data"], 
-                mime_type=f"audio/pcm;rate={SEND_SAMPLE_RATE}"
+                data=buf,
+                mime_type=SEND_MIME_TYPE
             )
             await self.session.send_realtime_input(audio=audio_blob)
             self.out_queue.task_done()
 
-    async def listen_audio(self):
+    def _mic_cb(self, in_data, frame_count, time_info, status):
+        """PortAudio callback: runs on the audio thread, never blocks.
+
+        Frames go straight from PortAudio into the asyncio queue via
+        call_soon_threadsafe — no thread-pool dispatch per chunk.
+        """
+        self.loop.call_soon_threadsafe(self._enqueue_mic, in_data)
+        return (None, pyaudio.paContinue)
+
+    def _enqueue_mic(self, data):
+        # Raw bytes go straight onto the queue: PortAudio already handed us
+        # an immutable buffer, so boxing it in a dict per frame only feeds
+        # the allocator.
+        try:
+            self.out_queue.put_nowait(data)
+        except asyncio.QueueFull:
+            # Sender is behind—drop the oldest frame (stale audio) and keep
+            # the newest so end-to-end latency stays bounded.
+            try:
+                self.out_queue.get_nowait()
+            except asyncio.QueueEmpty:
+                pass
+            self.out_queue.put_nowait(data)
+
+    async def start_listening(self):
         try:
             mic_info = pya.get_default_input_device_info()
             mic_index = mic_info.get("index")
         except:
             print("Warning: Could not get default mic info. Using default index 0.")
             mic_index = 0
-            
+
         self.audio_stream = await asyncio.to_thread(
             pya.open,
             format=FORMAT,
@@ -114,43 +163,60 @@ class AudioLoop:
             input=True,
             input_device_index=mic_index,
             frames_per_buffer=CHUNK_SIZE,
+            stream_callback=self._mic_cb,
         )
-        kwargs = {"exception_on_overflow": False}
 
         print("\n--- Listening to Microphone. Say something after the prompt! ---")
 
-        while True:
-            data = await asyncio.to_thread(self.audio_stream.read, CHUNK_SIZE, **kwargs)
-            await self.out_queue.put({"data": data})
-
     async def receive_audio(self):
-        "Reads from the session, prints text transcription, and writes pcm chunks to the play queue"
+        "Reads from the session, prints text transcription, and feeds pcm chunks to the playback ring buffer"
         while True:
             turn = self.session.receive()
             async for response in turn:
                 if data := response.data:
-                    self.audio_in_queue.put_nowait(data)
+                    self._spk_buf.append(data)
                     continue
                 if text := response.text:
-                    print(text, end="", flush=True) 
+                    print(text, end="", flush=True)
 
             # Stop playback on turn_complete
-            while not self.audio_in_queue.empty():
-                self.audio_in_queue.get_nowait()
-            print() 
+            self._spk_buf.clear()
+            self._spk_pending = bytearray()
+            print()
+
+    def _spk_cb(self, in_data, frame_count, time_info, status):
+        """PortAudio output callback: pulls PCM from the ring buffer.
 
-    async def play_audio(self):
-        stream = await asyncio.to_thread(
+        Underruns are padded with silence so playback never stalls the
+        audio thread or hops through the asyncio thread pool.
+        """
+        needed = frame_count * 2  # 16-bit mono PCM
+        out = self._spk_pending
+        while len(out) < needed and self._spk_buf:
+            try:
+                out += self._spk_buf.popleft()
+            except IndexError:
+                # turn_complete cleared the deque between the check and
+                # the pop; treat the buffer as drained
+                break
+        if len(out) >= needed:
+            chunk = bytes(out[:needed])
+            self._spk_pending = bytearray(out[needed:])
+        else:
+            chunk = bytes(out) + b"\x00" * (needed - len(out))
+            self._spk_pending = bytearray()
+        return (chunk, pyaudio.paContinue)
+
+    async def start_playback(self):
+        self.playback_stream = await asyncio.to_thread(
             pya.open,
             format=FORMAT,
             channels=CHANNELS,
             rate=RECEIVE_SAMPLE_RATE,
             output=True,
+            frames_per_buffer=480,
+            stream_callback=self._spk_cb,
         )
-        while True:
-            bytestream = await self.audio_in_queue.get()
-            await asyncio.to_thread(stream.write, bytestream)
-            self.audio_in_queue.task_done()
 
     async def run(self):
         try:
@@ -159,14 +225,14 @@ class AudioLoop:
                 asyncio.TaskGroup() as tg,
             ):
                 self.session = session
-                self.audio_in_queue = asyncio.Queue()
+                self.loop = asyncio.get_running_loop()
                 self.out_queue = asyncio.Queue(maxsize=5)
 
                 send_text_task = tg.create_task(self.send_text())
-                tg.create_task(self.send_realtime()) 
-                tg.create_task(self.listen_audio())  
-                tg.create_task(self.receive_audio()) 
-                tg.create_task(self.play_audio())    
+                tg.create_task(self.send_realtime())
+                await self.start_listening()  # Callback stream—no reader task
+                tg.create_task(self.receive_audio())
+                await self.start_playback()   # Callback stream—no writer task
 
                 await send_text_task
                 raise asyncio.CancelledError("User requested exit (or 'q' was typed)")
@@ -181,6 +247,8 @@ class AudioLoop:
         finally:
             if self.audio_stream:
                  await asyncio.to_thread(self.audio_stream.close)
+            if self.playback_stream:
+                 await asyncio.to_thread(self.playback_stream.close)
             # The client should be terminated last
             if 'pya' in globals():
                 await asyncio.to_thread(pya.terminate)
@@ -1,9 +1,21 @@
 import os
+import sys
+import time
 import asyncio
+import collections
+import concurrent.futures
 import io
 import traceback
 import pyaudio
 
+# libuv event loop: lower per-tick overhead for the audio queues and
+# WebSocket traffic. Falls back to the stdlib loop (e.g. on Windows).
+try:
+    import uvloop
+    asyncio.set_event_loop_policy(uvloop.EventLoopPolicy())
+except ImportError:
+    pass
+
 from google import genai
 from google.genai import types
 # --- EXPLICIT IMPORTS FOR CLARITY ---
@@ -17,12 +29,22 @@ CHANNELS = 1
 SEND_SAMPLE_RATE = 16000
 RECEIVE_SAMPLE_RATE = 24000
 CHUNK_SIZE = 1024
+# Precomputed once at import: this string is constant for the whole process,
+# so per-chunk sends don't re-format it.
+SEND_MIME_TYPE = f"audio/pcm;rate={SEND_SAMPLE_RATE}"
+# Mic frames are coalesced into ~128 ms superchunks before they enter the
+# ring: one ring slot, one Blob and one WebSocket frame per superchunk
+# instead of per 64 ms callback.
+MIC_SUPERCHUNK_BYTES = 4096
 
 MODEL = "models/gemini-2.5-flash-native-audio-preview-09-2025" 
 
 DEFAULT_MODE = "none"
 
 # Initialize Client
+# Socket tuning note: Nagle is already off for the live WebSocket — asyncio
+# (and uvloop) set TCP_NODELAY on every TCP stream transport they create, so
+# small PCM frames are not held back waiting for coalescing.
 client = genai.Client(
     http_options={"api_version": "v1beta"},
     api_key=os.environ.get("GEMINI_API_KEY"),
@@ -74,12 +96,48 @@ pya = pyaudio.PyAudio()
 class AudioLoop:
     def __init__(self, video_mode=DEFAULT_MODE):
         self.video_mode = video_mode
-        self.audio_in_queue = None
-        self.out_queue = None
         self.session = None
         self.audio_stream = None
+        self.playback_stream = None
+        self.loop = None  # Set in run(); used by the PortAudio callbacks
+        # Device enumeration scans the hardware — pay it once at
+        # construction instead of on every run(). The streams themselves
+        # still open in run(): their callbacks need the running loop.
+        try:
+            self._mic_index = pya.get_default_input_device_info().get("index")
+        except Exception:
+            print("Warning: Could not get default mic info. Using default index 0.")
+            self._mic_index = 0
+        # Playback ring buffer: receive_audio appends, the output callback
+        # pops. Individual deque ops are GIL-atomic, but clear() on
+        # turn_complete can race the callback's check-then-pop, so the pop
+        # itself is guarded in _spk_cb.
+        # maxlen bounds memory if the model outruns the sound card: the
+        # deque sheds its oldest chunk on append (FIFO trim) instead of
+        # growing without limit.
+        self._spk_buf = collections.deque(maxlen=64)
+        self._spk_pending = bytearray()
+        self._spk_off = 0  # Read cursor into _spk_pending
+        # Transcription text is batched ~50 ms before hitting stdout
+        self._out_buf = []
+        self._last_flush = 0.0
         # --- PUSH TO TALK FLAG ---
-        self.ptt_active = asyncio.Event()
+        # Plain bool: it is read per mic frame but only toggled per user
+        # turn, and nothing await-s on it anymore, so an asyncio.Event's
+        # Future machinery would be pure overhead.
+        self._ptt = False
+        # ~128 ms of pre-roll so the start of speech isn't clipped when PTT
+        # activates; frames older than that are dropped at the source.
+        self._preroll = collections.deque(maxlen=2)
+        # SPSC ring for mic frames: one producer (the mic enqueue scheduled
+        # on the loop) and one consumer (send_realtime) never race, so plain
+        # index arithmetic plus an Event replaces asyncio.Queue's per-frame
+        # lock/Future machinery. Oldest frames are overwritten when lapped.
+        self._ring = [None] * 8
+        self._head = 0
+        self._tail = 0
+        self._ready = asyncio.Event()
+        self._accum = bytearray()  # Partial superchunk being assembled
 
     # --- PTT Logic is now in ptt_loop task ---
     async def ptt_loop(self):
@@ -95,61 +153,99 @@ class AudioLoop:
             if text.lower() == "q":
                 break
             
-            if not self.ptt_active.is_set():
+            if not self._ptt:
                 print("--- PTT Active. Speaking... (Press [ENTER] when done) ---")
-                self.ptt_active.set() # Activate PTT
+                self._ptt = True # Activate PTT
                 
                 # Wait for the user to press ENTER again to signal end of turn
                 await asyncio.to_thread(input, "Speaking: ")
                 
                 print("--- PTT Deactivated. Sending to Gemini... ---")
-                self.ptt_active.clear() # Deactivate PTT
+                self._ptt = False # Deactivate PTT
+                # Discard any partial superchunk: trailing post-release
+                # audio is dropped by the sender anyway
+                self._accum.clear()
                 
                 # Send a blank message with end_of_turn=True to trigger the model's response
                 await self.session.send(end_of_turn=True)
             else:
                 # Should not happen if logic works, but clear if it does
-                self.ptt_active.clear() 
+                self._ptt = False
 
     async def send_realtime(self):
-        # This task now only runs when PTT is active
+        # The whole mic pipeline is two stages: the PortAudio callback
+        # gates/coalesces frames into the ring, and this single task sends
+        # them. A further fusion (sending straight from the callback hop)
+        # would need one task per superchunk and lose send ordering.
         while True:
-            msg = await self.out_queue.get()
-            
-            # Wait until PTT is active before sending audio
-            await self.ptt_active.wait() 
-            
+            # Only PTT-active frames reach the ring, so no gate needed
+            while self._tail == self._head:
+                self._ready.clear()
+                await self._ready.wait()
+            data = self._ring[self._tail & 7]
+            self._ring[self._tail & 7] = None  # Let the frame be collected
+            self._tail += 1
+
+            # PTT can clear between enqueue and here (user released the
+            # key); trailing frames would only waste bandwidth and model
+            # tokens after end_of_turn, so drop them.
+            if not self._ptt:
+                continue
+
+            # Blob itself stays per-call: the SDK validates/serializes each
+            # message, so rebinding one shared Blob's .data buys nothing.
             audio_blob = Blob(
-                data=msg["data"], 
-                mime_type=f"audio/pcm;rate={SEND_SAMPLE_RATE}"
+                data=data,
+                mime_type=SEND_MIME_TYPE
             )
             await self.session.send_realtime_input(audio=audio_blob)
-            self.out_queue.task_done()
+
+    def _mic_cb(self, in_data, frame_count, time_info, status):
+        """PortAudio callback: runs on the audio thread, never blocks.
+
+        Frames go straight from PortAudio into the asyncio queue via
+        call_soon_threadsafe — no thread-pool dispatch per chunk.
+        """
+        self.loop.call_soon_threadsafe(self._enqueue_mic, in_data)
+        return (None, pyaudio.paContinue)
+
+    def _enqueue_mic(self, data):
+        # `data` is the bytes object PortAudio built for the callback —
+        # it is carried by reference, so the only per-frame copy left is
+        # the required append into the superchunk accumulator.
+        # Idle frames would otherwise pile up against the queue bound while
+        # send_realtime has nothing to drain, so they are dropped here and
+        # only the pre-roll survives.
+        if not self._ptt:
+            self._preroll.append(data)
+            return
+        while self._preroll:
+            self._accum += self._preroll.popleft()
+        self._accum += data
+        if len(self._accum) >= MIC_SUPERCHUNK_BYTES:
+            self._push_ring(bytes(self._accum))
+            self._accum.clear()
+            self._ready.set()
+
+    def _push_ring(self, data):
+        self._ring[self._head & 7] = data
+        self._head += 1
+        # Sender is behind—advance the tail past overwritten (stale) frames
+        # so end-to-end latency stays bounded.
+        if self._head - self._tail > len(self._ring):
+            self._tail = self._head - len(self._ring)
 
     async def listen_audio(self):
-        try:
-            mic_info = pya.get_default_input_device_info()
-            mic_index = mic_info.get("index")
-        except:
-            print("Warning: Could not get default mic info. Using default index 0.")
-            mic_index = 0
-            
         self.audio_stream = await asyncio.to_thread(
             pya.open,
             format=FORMAT,
             channels=CHANNELS,
             rate=SEND_SAMPLE_RATE,
             input=True,
-            input_device_index=mic_index,
+            input_device_index=self._mic_index,
             frames_per_buffer=CHUNK_SIZE,
+            stream_callback=self._mic_cb,
         )
-        kwargs = {"exception_on_overflow": False}
-        
-        while True:
-            # This continuously reads audio, regardless of PTT status
-            data = await asyncio.to_thread(self.audio_stream.read, CHUNK_SIZE, **kwargs)
-            # The PTT flag in send_realtime controls whether the data is SENT to Gemini
-            await self.out_queue.put({"data": data})
 
     async def receive_audio(self):
         "Reads from the session, prints text transcription, and writes pcm chunks to the play queue"
@@ -157,31 +253,72 @@ class AudioLoop:
             turn = self.session.receive()
             async for response in turn:
                 if data := response.data:
-                    self.audio_in_queue.put_nowait(data)
+                    self._spk_buf.append(data)
                     continue
                 if text := response.text:
                     # Clear PTT flag if model starts responding
-                    if self.ptt_active.is_set():
-                         self.ptt_active.clear()
-                    print(text, end="", flush=True) 
+                    self._ptt = False
+                    # Buffer tokens: a flushed write(2) per streamed token
+                    # is a syscall storm on long answers
+                    self._out_buf.append(text)
+                    now = time.monotonic()
+                    if now - self._last_flush > 0.05:
+                        sys.stdout.write("".join(self._out_buf))
+                        sys.stdout.flush()
+                        self._out_buf.clear()
+                        self._last_flush = now
 
-            # Stop playback on turn_complete
-            while not self.audio_in_queue.empty():
-                self.audio_in_queue.get_nowait()
+            # Flush whatever transcription is still buffered
+            if self._out_buf:
+                sys.stdout.write("".join(self._out_buf))
+                self._out_buf.clear()
+            # Stop playback on turn_complete (O(1) flush of the ring)
+            self._spk_buf.clear()
+            self._spk_pending = bytearray()
+            self._spk_off = 0
             print() 
 
-    async def play_audio(self):
-        stream = await asyncio.to_thread(
+    def _spk_cb(self, in_data, frame_count, time_info, status):
+        """PortAudio output callback: pulls PCM from the ring buffer.
+
+        Underruns are padded with silence so playback never stalls the
+        audio thread or hops through the asyncio thread pool.
+        """
+        needed = frame_count * 2  # 16-bit mono PCM
+        out = self._spk_pending
+        off = self._spk_off
+        if len(out) - off < needed and self._spk_buf:
+            # Compact consumed bytes once per refill — a cursor plus
+            # memoryview slices replaces rebuilding the tail every call
+            del out[:off]
+            off = 0
+            while len(out) < needed and self._spk_buf:
+                try:
+                    out += self._spk_buf.popleft()
+                except IndexError:
+                    # turn_complete cleared the deque between the check
+                    # and the pop; treat the buffer as drained
+                    break
+        avail = len(out) - off
+        if avail >= needed:
+            chunk = memoryview(out)[off:off + needed].tobytes()
+            self._spk_off = off + needed
+        else:
+            chunk = memoryview(out)[off:].tobytes() + b"\x00" * (needed - avail)
+            del out[:]
+            self._spk_off = 0
+        return (chunk, pyaudio.paContinue)
+
+    async def start_playback(self):
+        self.playback_stream = await asyncio.to_thread(
             pya.open,
             format=FORMAT,
             channels=CHANNELS,
             rate=RECEIVE_SAMPLE_RATE,
             output=True,
+            frames_per_buffer=480,
+            stream_callback=self._spk_cb,
         )
-        while True:
-            bytestream = await self.audio_in_queue.get()
-            await asyncio.to_thread(stream.write, bytestream)
-            self.audio_in_queue.task_done()
 
     async def run(self):
         try:
@@ -190,16 +327,23 @@ class AudioLoop:
                 asyncio.TaskGroup() as tg,
             ):
                 self.session = session
-                self.audio_in_queue = asyncio.Queue()
-                self.out_queue = asyncio.Queue(maxsize=5)
+                self.loop = asyncio.get_running_loop()
+                # Audio runs on PortAudio callbacks, so to_thread only
+                # carries blocking input() and one-time stream setup: two
+                # pinned workers beat the default min(32, ncpu+4) pool.
+                self.loop.set_default_executor(
+                    concurrent.futures.ThreadPoolExecutor(
+                        max_workers=2, thread_name_prefix="steve-io"
+                    )
+                )
 
                 # The PTT loop replaces the simple send_text task
                 ptt_task = tg.create_task(self.ptt_loop())
                 
                 tg.create_task(self.send_realtime()) 
-                tg.create_task(self.listen_audio())  
+                await self.listen_audio()  # Callback stream—no reader task
                 tg.create_task(self.receive_audio()) 
-                tg.create_task(self.play_audio())    
+                await self.start_playback()  # Callback stream—no writer task
 
                 await ptt_task
                 raise asyncio.CancelledError("User requested exit (or 'q' was typed)")
@@ -213,6 +357,8 @@ class AudioLoop:
         finally:
             if self.audio_stream:
                  await asyncio.to_thread(self.audio_stream.close)
+            if self.playback_stream:
+                 await asyncio.to_thread(self.playback_stream.close)
             if 'pya' in globals():
                 await asyncio.to_thread(pya.terminate)
             print("Cleanup complete.")
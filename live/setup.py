@@ -1,11 +1,16 @@
 # python
-import google.genai
-import pillow  # Check for pillow
-import pyaudio # Check for pyaudio
+# Dependency check via installed-package metadata: version() reads the dist
+# info without executing the libraries' top-level imports (Pillow and PyAudio
+# both initialize C extensions on import, and `import pillow` was simply
+# wrong — the module is named PIL).
+from importlib.metadata import version, PackageNotFoundError
 
-print("--- Successfully imported all target libraries! ---")
-print(f"Google GenAI SDK version: {google.genai.__version__}")
-# Note: Pydantic is likely imported internally by google.genai
+print("--- Checking target libraries ---")
+for package in ("google-genai", "pillow", "PyAudio"):
+    try:
+        print(f"{package} version: {version(package)}")
+    except PackageNotFoundError:
+        print(f"❌ {package} is NOT installed.")
 
 # --- Configuration ---
 # You need to set your API key as an environment variable in Termux:
@@ -13,8 +18,8 @@ print(f"Google GenAI SDK version: {google.genai.__version__}")
 # You should restart Termux or open a new session after setting the variable.
 
 try:
+    import google.genai
     client = google.genai.Client()
     print("Client initialized successfully.")
 except Exception as e:
     print(f"Error initializing client (check API Key and environment): {e}")
-